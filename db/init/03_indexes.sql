@@ -0,0 +1,17 @@
+-- Approximate nearest-neighbour index for cross-modal retrieval; the partial
+-- predicate matches the query, which skips all-zero fingerprints (undefined
+-- cosine distance)
+CREATE INDEX IF NOT EXISTS retrofingerprint_fp_b512_hnsw
+  ON retrofingerprint
+  USING hnsw (fp_retro_b512_vec_binary vector_cosine_ops)
+  WHERE vector_norm(fp_retro_b512_vec_binary) > 0;
+
+ANALYZE retrofingerprint;
+
+-- Lookups of annotations for a subset of targets (annotation_counts_subset)
+CREATE INDEX IF NOT EXISTS annotation_compound_id_idx
+  ON annotation (compound_id);
+CREATE INDEX IF NOT EXISTS annotation_genbank_region_id_idx
+  ON annotation (genbank_region_id);
+
+ANALYZE annotation;
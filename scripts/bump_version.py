@@ -13,11 +13,11 @@ ROOT = pathlib.Path(__file__).resolve().parents[1]
 PACKAGE_JSON = ROOT / "src" / "client" / "package.json"
 
 
-def read_package_json() -> tuple[str, tuple[int, int, int]]:
+def read_package_json() -> tuple[dict, tuple[int, int, int]]:
     """
     Read package.json and extract the current version.
     
-    :return: tuple of file content and version tuple (major, minor, patch)
+    :return: tuple of parsed package.json data and version tuple (major, minor, patch)
     """
     # txt = PYPROJECT.read_text(encoding="utf-8")
     # m = re.search(r'(?m)^\s*version\s*=\s*"(\d+)\.(\d+)\.(\d+)"\s*$', txt)
@@ -29,18 +29,17 @@ def read_package_json() -> tuple[str, tuple[int, int, int]]:
     m = re.match(r"^(\d+)\.(\d+)\.(\d+)$", version_str)
     if not m:
         raise SystemExit("Could not find version = \"X.Y.Z\" in package.json")
-    return txt, tuple(map(int, m.groups()))
+    return data, tuple(map(int, m.groups()))
 
 
-def write_package_json(txt: str, new_version: str) -> None:
+def write_package_json(data: dict, new_version: str) -> None:
     """
     Write the new version back to package.json.
 
-    :param txt: original file content
+    :param data: parsed package.json data
     :param new_version: new version string
     :return: None
     """
-    data = json.loads(txt)
     data["version"] = new_version
     PACKAGE_JSON.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
 
@@ -72,9 +71,9 @@ def main() -> None:
     p.add_argument("kind", choices=["major", "minor", "patch"])
     args = p.parse_args()
 
-    txt, cur = read_package_json()
+    data, cur = read_package_json()
     new_version = bump(cur, args.kind)
-    write_package_json(txt, new_version)
+    write_package_json(data, new_version)
     print(new_version)  # workflow reads new version from stdout for tagging
 
 
@@ -1,10 +1,16 @@
 """Module for configuring the Flask app."""
 
+import atexit
+import decimal
 import logging
 import os
+import threading
 import time
+import typing as t
 
-from flask import Flask, jsonify
+import orjson
+from flask import Flask, Response, abort, current_app, jsonify, request
+from flask.json.provider import JSONProvider
 
 from routes.session import (
     blp_create_session,
@@ -16,6 +22,7 @@ from routes.session_store import get_or_init_app_start_epoch
 from routes.query import dsn_from_env, blp as query_blp
 from routes.jobs import (
     blp_submit_compound,
+    blp_submit_compound_batch,
     blp_submit_gene_cluster,
 )
 from routes.views import (
@@ -25,128 +32,264 @@ from routes.views import (
 )
 
 
-# Initialize the Flask app
-app = Flask(__name__)
-
-# Logging setup
-# In development: simple basicConfig
-# In production (under gunicorn): reuse gunicorn's error logger handlers
-if os.getenv("FLASK_ENV") == "development":
-    logging.basicConfig(level=logging.DEBUG)
-    app.logger.setLevel(logging.DEBUG)
-else:
-    gunicorn_logger = logging.getLogger("gunicorn.error")
-    if gunicorn_logger.handlers:
-        app.logger.handlers = gunicorn_logger.handlers
-        app.logger.setLevel(gunicorn_logger.level)
-    else:
-        # Fallback if not under gunicorn
-        logging.basicConfig(level=logging.INFO)
-        app.logger.setLevel(logging.INFO)
+# Environment is fixed for the lifetime of the process; read it once
+_APP_VERSION = os.getenv("APP_VERSION", "unknown")
+_DSN = dsn_from_env()
+
+# Pre-rendered JSON bodies for the probe endpoints; only the numbers vary per request
+_STARTUP_TMPL = b'{"startup":%d,"current":%d,"uptime":%d}'
+_HEALTH_TMPL = (
+    b'{"status":"ok","time":%d,"uptime":%d,"version":'
+    + orjson.dumps(_APP_VERSION).replace(b"%", b"%%")
+    + b"}"
+)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Used by `jsonify` and `request.get_json`. Besides the types orjson handles
+    natively (datetime, UUID, dataclasses, NumPy arrays and scalars), decimals
+    and objects with `__html__` are serialized the same way as Flask's default
+    provider.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    @staticmethod
+    def _default(o: t.Any) -> t.Any:
+        """
+        Serialize types orjson does not support natively.
+
+        :param o: the object to serialize
+        :return: a JSON-serializable representation of the object
+        :raises TypeError: if the object cannot be serialized
+        """
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if hasattr(o, "__html__"):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
 
-app.logger.info("Flask logger configured")
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        """
+        Serialize data as JSON.
 
+        :param obj: the data to serialize
+        :param kwargs: ignored, for compatibility with Flask's provider API
+        :return: the JSON string
+        """
+        return orjson.dumps(obj, default=self._default, option=self.option).decode("utf-8")
 
-# Set environment and debug mode
-app.config["ENV"] = os.getenv("FLASK_ENV", "production")  # defaults to "production"
-app.config["DEBUG"] = app.config["ENV"] == "development"
-print("starting app in environment:", app.config["ENV"])
-print("debug mode is:", app.debug)
+    def loads(self, s: str | bytes, **kwargs: t.Any) -> t.Any:
+        """
+        Deserialize data as JSON.
 
+        :param s: the JSON text or bytes
+        :param kwargs: ignored, for compatibility with Flask's provider API
+        :return: the deserialized data
+        """
+        return orjson.loads(s)
 
-# Log the environment
-if app.config["ENV"] == "production":
-    print("production environment detected")
-elif app.config["ENV"] == "development":
-    print("development environment detected")
-else:
-    print(f"unknown environment: {app.config['ENV']}")
+    def response(self, *args: t.Any, **kwargs: t.Any) -> Response:
+        """
+        Serialize the given arguments as JSON and return a response with the
+        `application/json` mimetype, skipping the intermediate str.
 
+        :return: the JSON response
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self._default, option=self.option)
+        return self._app.response_class(body, mimetype="application/json")
 
-# Register api endpoints
-@app.errorhandler(404)
-def not_found(_) -> str:
+
+def not_found(_) -> tuple[Response, int] | Response:
     """
-    Handle 404 errors by returning the main index page.
+    Handle 404 errors by returning the main index page, if served by Flask.
 
     :param _: the error, not used
-    :return: the index HTML page
+    :return: the index HTML page, or a JSON error for API paths
     """
-    return app.send_static_file("index.html")
+    if not current_app.config["SERVE_INDEX"] or request.path.startswith("/api/"):
+        return jsonify({"error": "Not found"}), 404
+    return current_app.send_static_file("index.html")
 
 
-@app.route("/")
-def index() -> str:
+def index() -> Response:
     """
     Serve the main index page.
 
     :return: the index HTML page
     """
-    return app.send_static_file("index.html")
+    if not current_app.config["SERVE_INDEX"]:
+        abort(404)
+    return current_app.send_static_file("index.html")
 
 
-@app.route("/api/startup")
-def startup() -> tuple[dict[str, int], int]:
+def startup() -> Response:
     """
     Get the startup time of the server.
     
-    :return: a dictionary with startup, current time, uptime and HTTP status code
+    :return: a JSON response with startup, current time and uptime
     """
     startup_epoch = get_or_init_app_start_epoch()
-    return jsonify({
-        "startup": startup_epoch,
-        "current": int(time.time()),
-        "uptime": int(time.time()) - startup_epoch,
-    }), 200
+    now = int(time.time())
+    body = _STARTUP_TMPL % (startup_epoch, now, now - startup_epoch)
+    return Response(body, mimetype="application/json")
 
 
-@app.route("/api/health", methods=["GET"])
-def health() -> tuple[dict[str, str], int]:
+def health() -> Response:
     """
     Health check endpoint.
 
-    :return: a dictionary indicating the server is healthy and HTTP status code
+    Pure process liveness check that never touches the database; use
+    `/api/ready` as the database readiness probe.
+
+    :return: a JSON response indicating the server is healthy
+    """
+    now = int(time.time())
+    body = _HEALTH_TMPL % (now, now - current_app.config["START_EPOCH"])
+    resp = Response(body, mimetype="application/json")
+
+    # Body changes every second; let intermediate caches coalesce probes
+    resp.cache_control.max_age = 1
+    resp.cache_control.must_revalidate = True
+    return resp
+
+
+def version() -> Response:
+    """
+    Get the version of the running server.
+
+    The version only changes on deploy, so it doubles as the ETag and clients
+    revalidating with `If-None-Match` get an empty 304 response.
+
+    :return: a JSON response with the server version, or an empty 304 response
+    """
+    if request.if_none_match.contains(_APP_VERSION):
+        resp = Response(status=304)
+    else:
+        resp = jsonify({"version": _APP_VERSION})
+    resp.set_etag(_APP_VERSION)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 300
+    return resp
+
+
+# Readiness probe connection pool; created lazily on first probe so that a
+# misconfigured database does not prevent the app from starting
+_READY_POOL = None
+_READY_POOL_LOCK = threading.Lock()
+
+
+def _get_ready_pool():
     """
-    return jsonify({
-        "status": "ok",
-        "time": int(time.time()),
-        "uptime": int(time.time()) - app.config["START_EPOCH"],
-    }), 200
+    Get the connection pool used by the readiness probe, creating it if needed.
 
+    :return: the readiness probe connection pool
+    """
+    global _READY_POOL
+    if _READY_POOL is None:
+        with _READY_POOL_LOCK:
+            if _READY_POOL is None:
+                from psycopg_pool import ConnectionPool
+                _READY_POOL = ConnectionPool(
+                    _DSN,
+                    min_size=1,
+                    max_size=2,
+                    timeout=3,
+                    kwargs={"connect_timeout": 3, "autocommit": True},
+                    open=True,
+                )
+                atexit.register(_READY_POOL.close)
+    return _READY_POOL
 
-@app.route("/api/ready", methods=["GET"])
-def ready() -> tuple[dict[str, str], int]:
+
+def ready() -> tuple[Response, int] | Response:
     """
     Returns 200 only if the app can read from Postgres.
 
-    :return: a dictionary indicating readiness and HTTP status code
-    .. note:: this requires the `psycopg` package to be installed
+    Readiness probe only; do not wire liveness checks to this endpoint, as
+    transient database slowness would then restart healthy processes.
+
+    :return: a JSON response indicating readiness
+    .. note:: this requires the `psycopg` and `psycopg_pool` packages to be installed
     """
     try:
-        import psycopg
+        pool = _get_ready_pool()
     except ImportError:
-        return jsonify({"status": "psycopg not installed"}), 500
-    
-    dsn = dsn_from_env()
+        return jsonify({"status": "psycopg_pool not installed"}), 500
 
     try:
-        with psycopg.connect(dsn, connect_timeout=3) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1;")
-                cur.fetchone()
-        return jsonify({"status": "ready"}), 200
+        with pool.connection() as conn:
+            # Empty query round-trips to the server without invoking the planner
+            conn.execute("")
+        return jsonify({"status": "ready"})
     except Exception as e:
         return jsonify({"status": "not ready", "error": str(e)}), 503
 
 
-# Register blueprints
-app.register_blueprint(blp_create_session)
-app.register_blueprint(blp_delete_session)
-app.register_blueprint(blp_get_session)
-app.register_blueprint(blp_save_session)
-app.register_blueprint(query_blp)
-app.register_blueprint(blp_submit_compound)
-app.register_blueprint(blp_submit_gene_cluster)
-app.register_blueprint(blp_get_embedding_space)
-app.register_blueprint(blp_enrich)
-app.register_blueprint(blp_run_msa)
+def create_app() -> Flask:
+    """
+    Create and configure the Flask app.
+
+    :return: the configured Flask app
+    """
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.config["START_EPOCH"] = int(time.time())
+
+    # In production nginx serves the frontend bundle and only proxies `/api/` to
+    # Flask; only fall back to serving index.html when a local build is present
+    app.config["SERVE_INDEX"] = os.path.isfile(os.path.join(app.static_folder, "index.html"))
+
+    # Logging setup
+    # In development: simple basicConfig
+    # In production (under gunicorn): reuse gunicorn's error logger handlers
+    if os.getenv("FLASK_ENV") == "development":
+        logging.basicConfig(level=logging.DEBUG)
+        app.logger.setLevel(logging.DEBUG)
+    else:
+        gunicorn_logger = logging.getLogger("gunicorn.error")
+        if gunicorn_logger.handlers:
+            app.logger.handlers = gunicorn_logger.handlers
+            app.logger.setLevel(gunicorn_logger.level)
+        else:
+            # Fallback if not under gunicorn
+            logging.basicConfig(level=logging.INFO)
+            app.logger.setLevel(logging.INFO)
+
+    app.logger.info("Flask logger configured")
+
+    # Set environment and debug mode
+    app.config["ENV"] = os.getenv("FLASK_ENV", "production")  # defaults to "production"
+    app.config["DEBUG"] = app.config["ENV"] == "development"
+    app.logger.info(f"Starting app in {app.config['ENV']} environment (debug={app.debug})")
+
+    # Register api endpoints
+    app.register_error_handler(404, not_found)
+    app.add_url_rule("/", view_func=index)
+    app.add_url_rule("/api/startup", view_func=startup)
+    app.add_url_rule("/api/health", view_func=health, methods=["GET"])
+    app.add_url_rule("/api/getVersion", view_func=version, methods=["GET"])
+    app.add_url_rule("/api/ready", view_func=ready, methods=["GET"])
+
+    # Register blueprints
+    app.register_blueprint(blp_create_session)
+    app.register_blueprint(blp_delete_session)
+    app.register_blueprint(blp_get_session)
+    app.register_blueprint(blp_save_session)
+    app.register_blueprint(query_blp)
+    app.register_blueprint(blp_submit_compound)
+    app.register_blueprint(blp_submit_compound_batch)
+    app.register_blueprint(blp_submit_gene_cluster)
+    app.register_blueprint(blp_get_embedding_space)
+    app.register_blueprint(blp_enrich)
+    app.register_blueprint(blp_run_msa)
+
+    return app
+
+
+# Module-level app for gunicorn ("app:app") and `flask --app app`
+app = create_app()
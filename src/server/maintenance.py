@@ -3,6 +3,7 @@
 import time
 import logging
 import os
+import random
 
 from routes.session_store import mark_stale_processing_items
 
@@ -12,20 +13,22 @@ logger = logging.getLogger(__name__)
 
 
 INTERVAL_SECONDS = int(os.getenv("JOB_WATCHDOG_INTERVAL_SECONDS", "130"))
+JITTER_SECONDS = int(os.getenv("JOB_WATCHDOG_JITTER_SECONDS", "30"))
 
 
 def main() -> None:
     """
     Main loop for running maintenance tasks.
     """
-    logger.info(f"Starting maintenance loop with interval {INTERVAL_SECONDS} seconds")
+    logger.info(f"Starting maintenance loop with interval {INTERVAL_SECONDS} seconds (jitter {JITTER_SECONDS} seconds)")
     while True:
         try:
             updated = mark_stale_processing_items()
             logger.info(f"Marked {updated} stale processing items as timeout error")
         except Exception as e:
             logger.exception(f"Error during maintenance loop: {e}")
-        time.sleep(INTERVAL_SECONDS)
+        # Jitter so replicas started together do not sweep Redis in lockstep
+        time.sleep(INTERVAL_SECONDS + random.uniform(0, JITTER_SECONDS))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 """Module providing helper functions for endpoints."""
 
-import uuid
-from typing import Any
+import os
+from itertools import chain
+from typing import Any, Iterable
 
 import numpy as np
 
@@ -10,9 +11,20 @@ def get_unique_identifier() -> str:
     """
     Generate a unique identifier string.
     
-    :return: unique identifier as a string
+    :return: unique identifier as a 32-character hex string
     """
-    return str(uuid.uuid4())
+    return os.urandom(16).hex()
+
+
+def get_unique_identifiers(n: int) -> list[str]:
+    """
+    Generate multiple unique identifier strings with a single entropy draw.
+
+    :param n: the number of identifiers to generate
+    :return: list of n unique identifiers as 32-character hex strings
+    """
+    hexstr = os.urandom(16 * n).hex()
+    return [hexstr[i:i + 32] for i in range(0, len(hexstr), 32)]
 
 
 def bits_to_hex(bits: np.ndarray) -> str:
@@ -24,15 +36,32 @@ def bits_to_hex(bits: np.ndarray) -> str:
     :return: hexadecimal string representation
     :raises ValueError: if input shape is incorrect
     """
-    # Flatten in case the shape is (1, 512)
-    flat = bits.reshape(-1)
+    # Flatten in case the shape is (1, 512); no copy for contiguous bool/uint8 input
+    flat = np.ascontiguousarray(bits, dtype=np.uint8).reshape(-1)
 
     if flat.shape[0] != 512:
         raise ValueError("Input array must have shape (512,) or (1, 512)")
     
-    bitstring = "".join(str(int(b)) for b in flat)  # 512 characters
-    hexstr = hex(int(bitstring, 2))[2:].zfill(128)  # 128-char hex
-    return hexstr
+    packed = np.packbits(flat, bitorder="big")  # 64 bytes, MSB-first
+    return packed.tobytes().hex()  # 128-char hex
+
+
+def bits_to_hex_batch(bits: np.ndarray) -> list[str]:
+    """
+    Convert a batch of 512-bit numpy arrays (shape (N, 512)) of 0/1 ints into
+    128-character hexadecimal strings, packing all rows in one call.
+
+    :param bits: numpy array of shape (N, 512) with values 0 or 1
+    :return: list of N hexadecimal string representations
+    :raises ValueError: if input shape is incorrect
+    """
+    rows = np.ascontiguousarray(bits, dtype=np.uint8)
+
+    if rows.ndim != 2 or rows.shape[1] != 512:
+        raise ValueError("Input array must have shape (N, 512)")
+
+    hexstr = np.packbits(rows, axis=1, bitorder="big").tobytes().hex()  # N * 128 chars
+    return [hexstr[i:i + 128] for i in range(0, len(hexstr), 128)]
 
 
 def hex_to_bits(hexstr: str) -> np.ndarray:
@@ -47,9 +76,24 @@ def hex_to_bits(hexstr: str) -> np.ndarray:
     if len(hexstr) != 128:
         raise ValueError("Input hexadecimal string must be 128 characters long")
     
-    bit_int = int(hexstr, 16)
-    bitstring = bin(bit_int)[2:].zfill(512)  # binary string of length 512
-    return np.array([int(b) for b in bitstring], dtype=np.int8)
+    packed = np.frombuffer(bytes.fromhex(hexstr), dtype=np.uint8)  # 64 bytes
+    return np.unpackbits(packed).astype(np.int8)
+
+
+def hex_to_packed(hexstrs: list[str]) -> np.ndarray:
+    """
+    Convert a batch of 128-character hexadecimal strings into packed 512-bit
+    fingerprints, decoding all strings in one call.
+
+    :param hexstrs: list of N hexadecimal string representations
+    :return: numpy uint8 array of shape (N, 64), MSB-first like `bits_to_hex`
+    :raises ValueError: if any input string length is incorrect
+    """
+    if any(len(h) != 128 for h in hexstrs):
+        raise ValueError("Input hexadecimal strings must be 128 characters long")
+
+    packed = np.frombuffer(bytes.fromhex("".join(hexstrs)), dtype=np.uint8)
+    return packed.reshape(len(hexstrs), 64)
 
 
 def kmerize_sequence(sequence: list[Any], k: int) -> list[list[Any]]:
@@ -60,17 +104,23 @@ def kmerize_sequence(sequence: list[Any], k: int) -> list[list[Any]]:
     :param k: length of each k-mer
     :return: list of k-mer strings
     """
-    kmers = []
-    seq_length = len(sequence)
-    
-    # Forward k-mers
-    for i in range(seq_length - k + 1):
-        kmer = sequence[i:i + k]
-        kmers.append(kmer)
-    
-    # Backward k-mers
-    for i in range(seq_length - k, -1, -1):
-        kmer = sequence[i:i + k]
-        kmers.append(kmer)
-    
-    return kmers
+    # Elements are tuples (e.g., (name, smiles)), so slice lists directly rather
+    # than going through a NumPy view; backward k-mers reuse the forward slices
+    forward = [sequence[i:i + k] for i in range(len(sequence) - k + 1)]
+    return forward + forward[::-1]
+
+
+def kmers_batch(sequences: list[list[Any]], ks: Iterable[int]) -> list[list[Any]]:
+    """
+    Generate k-mers (forward and backward) for multiple sequences and k-mer lengths.
+
+    :param sequences: list of sequences, each a list of elements
+    :param ks: the k-mer lengths to generate, in order
+    :return: list of k-mers, ordered by k first and then by sequence
+    """
+    return list(chain.from_iterable(
+        kmerize_sequence(sequence, k)
+        for k in ks
+        for sequence in sequences
+        if len(sequence) >= k
+    ))
@@ -1,63 +1,207 @@
 """Module for defining job endpoints."""
 
+import hashlib
+import logging
+import multiprocessing
+import os
 import re
 import tempfile
+import threading
 import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import TYPE_CHECKING, Annotated, Any
 
+import msgspec
 import numpy as np
 from flask import Blueprint, current_app, request, jsonify
-from retromol.api import run_retromol
-from retromol.fingerprint import (
-    FingerprintGenerator,
-    NameSimilarityConfig,
-    polyketide_family_of,
-    polyketide_ancestors_of,
+
+from routes.helpers import (
+    bits_to_hex,
+    bits_to_hex_batch,
+    get_unique_identifiers,
+    kmers_batch,
 )
-from retromol.io import Input as RetroMolInput
-from retromol.rules import get_path_default_matching_rules
-from retromol.readout import linear_readout as retromol_linear_readout
-from biocracker.antismash import parse_region_gbk_file
-from biocracker.readout import NRPSModuleReadout, PKSModuleReadout, linear_readouts as biocracker_linear_readouts
-from biocracker.text_mining import get_default_tokenspecs, mine_virtual_tokens
-
-from routes.helpers import bits_to_hex, get_unique_identifier, kmerize_sequence
 from routes.models_registry import get_cache_dir, get_paras_model
-from routes.session_store import load_session_with_items, update_item
+from routes.session_store import (
+    load_cached_compound,
+    load_item,
+    load_session_meta,
+    patch_loaded_item,
+    save_cached_compound,
+    update_item,
+)
+
+# RetroMol, RDKit and BioCracker are imported inside the functions that use
+# them; these only run in job worker processes, so the web process never
+# pays their import time or memory
+if TYPE_CHECKING:
+    from retromol.fingerprint import FingerprintGenerator
+
+logger = logging.getLogger(__name__)
 
 blp_submit_compound = Blueprint("submit_compound", __name__)
+blp_submit_compound_batch = Blueprint("submit_compound_batch", __name__)
 blp_submit_gene_cluster = Blueprint("submit_gene_cluster", __name__)
 
 
+# Hex encoding of an all-zero 512-bit fingerprint
+_EMPTY_FP_HEX = "0" * 128
+
+
+NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class SubmitCompoundRequest(msgspec.Struct):
+    """Request body of `/api/submitCompound`."""
+
+    sessionId: NonEmptyStr
+    itemId: NonEmptyStr
+    name: str | None = None
+    smiles: str | None = None
+
+
+class SubmitCompoundBatchEntry(msgspec.Struct):
+    """Single compound in the request body of `/api/submitCompoundBatch`."""
+
+    itemId: NonEmptyStr
+    name: str | None = None
+    smiles: str | None = None
+
+
+class SubmitCompoundBatchRequest(msgspec.Struct):
+    """Request body of `/api/submitCompoundBatch`."""
+
+    sessionId: NonEmptyStr
+    items: Annotated[list[SubmitCompoundBatchEntry], msgspec.Meta(min_length=1)]
+
+
+class SubmitGeneClusterRequest(msgspec.Struct):
+    """Request body of `/api/submitGeneCluster`."""
+
+    sessionId: NonEmptyStr
+    itemId: NonEmptyStr
+    name: str | None = None
+    fileContent: str | None = None
+
+
 COLLAPSE_BY_NAME = {
     "glycosylation": ["glycosyltransferase"],
     "methylation": ["methyltransferase"],
 }
 
+# Reverse lookup from mined token to collapsed family name
+COLLAPSE_LOOKUP = {value: name for name, values in COLLAPSE_BY_NAME.items() for value in values}
+
+# Monomer name per PKS module type
+PKS_MAP = {
+    "PKS_A": "A",
+    "PKS_B": "B",
+    "PKS_C": "C",
+    "PKS_D": "D",
+}
+
+
+# Heavy compute runs in a background process pool so that request threads return
+# immediately; clients poll the session for the final item status
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0")) or os.cpu_count() or 1
+
+# The executor is created lazily on first submit, so that it is not shared
+# with processes forked from a preloading gunicorn master
+_PROCESS_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """
+    Get the process pool for CPU-bound jobs, creating it if needed.
 
-def _set_item_status_inplace(item: dict, status: str, error_message: str | None = None) -> None:
+    :return: the process pool executor
+    """
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        with _POOL_LOCK:
+            if _PROCESS_POOL is None:
+                _PROCESS_POOL = ProcessPoolExecutor(
+                    max_workers=JOB_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _PROCESS_POOL
+
+
+def _submit_job(fn: Any, *args: Any) -> Future:
+    """
+    Submit a job to the process pool, replacing the pool once if it is broken.
+
+    A worker that dies abruptly (e.g. a segfault or the OOM killer) breaks the
+    whole executor; its in-flight futures fail with `BrokenProcessPool`, so
+    their done callbacks store an error, and later submits get a fresh pool.
+
+    :param fn: the function to run in a worker
+    :param args: the arguments to the function
+    :return: the job future
+    """
+    global _PROCESS_POOL
+    pool = _get_process_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning("job process pool is broken; replacing it")
+        with _POOL_LOCK:
+            # Another thread may have replaced it already
+            if _PROCESS_POOL is pool:
+                _PROCESS_POOL = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return _get_process_pool().submit(fn, *args)
+
+
+def _status_patch(status: str, error_message: str | None = None, ts_ms: int | None = None) -> dict[str, Any]:
     """
-    Update the status and error message of an item in place.
+    Build the item patch for a status transition.
 
-    :param item: the item dictionary to update
     :param status: the new status string
-    :param error_message: optional error message string
+    :param error_message: optional error message string; cleared when not given
+    :param ts_ms: optional update timestamp in milliseconds; defaults to now
+    :return: the patch to apply to the item
     """
-    item["status"] = status
-    item["updatedAt"] = int(time.time() * 1000)
+    return {
+        "status": status,
+        "updatedAt": ts_ms if ts_ms is not None else time.time_ns() // 1_000_000,
+        "errorMessage": error_message,
+    }
+
 
-    if error_message is not None:
-        item["errorMessage"] = error_message
-    else:
-        if "errorMessage" in item:
-            item["errorMessage"] = None
+def _mark_job_started(session_id: str, item_id: str) -> None:
+    """
+    Mark a queued item as processing once a worker picks up its job.
 
+    Runs in the job worker, so that the job timeout counts from the start of
+    the job rather than from its submission.
 
-def _setup_fingerprint_generator() -> FingerprintGenerator:
+    :param session_id: the session ID
+    :param item_id: the item ID
+    """
+    try:
+        update_item(session_id, item_id, _status_patch("processing"))
+    except Exception as e:
+        # Status bookkeeping only; the job itself can still run
+        logger.warning(f"failed to mark item_id={item_id} as processing: {e}")
+
+
+@lru_cache(maxsize=1)
+def _setup_fingerprint_generator() -> "FingerprintGenerator":
     """
     Setup and return a FingerprintGenerator instance.
 
+    The generator only depends on static configuration, so it is built once per
+    process and reused across requests.
+
     :return: FingerprintGenerator instance
     """
+    from retromol.fingerprint import FingerprintGenerator, NameSimilarityConfig, polyketide_ancestors_of
+    from retromol.rules import get_path_default_matching_rules
+
     path_default_matching_rules = get_path_default_matching_rules()
     collapse_by_name: list[str] = list(COLLAPSE_BY_NAME.keys())
     cfg = NameSimilarityConfig(
@@ -75,16 +219,129 @@ def _setup_fingerprint_generator() -> FingerprintGenerator:
     return generator
 
 
-def _compute_compound(generator: FingerprintGenerator, smiles: str) -> tuple[list[float], list[str], list[dict]]:
+def _readout_node(node_id: str, name: str, smiles: str | None) -> dict[str, Any]:
     """
-    Compute 512-bit fingerprint for a compound given its SMILES.
+    Build a linear readout node.
 
-    :param generator: the fingerprint generator instance
-    :param smiles: the SMILES string of the compound
-    :return: tuple of (list of coverage values, list of fingerprint hex strings, list of linear readouts)
+    :param node_id: the node ID
+    :param name: the monomer name
+    :param smiles: the monomer SMILES string, if known
+    :return: the readout node
+    """
+    return {"id": node_id, "name": name, "displayName": None, "smiles": smiles}
+
+
+def _canonicalize_smiles(smiles: str) -> str:
+    """
+    Canonicalize a SMILES string so that equivalent inputs share a cache key.
+
+    :param smiles: the SMILES string
+    :return: the canonical isomeric SMILES, or the input if it cannot be parsed
+    """
+    from rdkit import Chem
+
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return smiles  # let RetroMol report the parse error
+    return Chem.MolToSmiles(mol, canonical=True, isomericSmiles=True)
+
+
+# Bump when the compound pipeline in this module changes its output
+COMPOUND_CACHE_SCHEMA = 1
+
+
+def _package_version(package: str) -> str:
+    """
+    Get the installed version of a package.
+
+    :param package: the distribution name
+    :return: the version string, or "unknown" if it cannot be determined
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@lru_cache(maxsize=1)
+def _compound_cache_version() -> str:
+    """
+    Fingerprint everything a cached compound result depends on besides the SMILES.
+
+    Covers the RetroMol and RDKit versions, the matching rules and the
+    fingerprint configuration, so that results computed before an upgrade or
+    configuration change are not served from the shared cache.
+
+    :return: short hexadecimal version token
+    """
+    import rdkit
+    from retromol.rules import get_path_default_matching_rules
+
+    h = hashlib.blake2b(digest_size=8)
+    h.update(f"schema={COMPOUND_CACHE_SCHEMA};".encode())
+    h.update(f"retromol={_package_version('retromol')};rdkit={rdkit.__version__};".encode())
+    h.update(f"collapse={sorted(COLLAPSE_BY_NAME.items())};".encode())
+    with open(get_path_default_matching_rules(), "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=10_000)
+def _compute_compound_cached(smiles_canonical: str) -> tuple[float, tuple[str, ...], tuple[tuple[str, tuple[tuple[str, str | None], ...]], ...]]:
+    """
+    Compute coverage, fingerprints and linear readouts for a canonical SMILES.
+
+    Results are memoized per process, backed by a Redis cache that is shared
+    across sessions and restarts. Readouts are returned without identifiers
+    so that every caller gets freshly identified nodes.
+
+    :param smiles_canonical: the canonical SMILES string of the compound
+    :return: tuple of (coverage, fingerprint hex strings, readouts as (name, ((monomer name, monomer smiles), ...)))
+    """
+    digest = hashlib.blake2b(smiles_canonical.encode("utf-8"), digest_size=16).hexdigest()
+    cache_key = f"{_compound_cache_version()}:{digest}"
+
+    # The shared cache is an optimization only; never fail a job because of it,
+    # and recompute when an entry cannot be read
+    try:
+        cached = load_cached_compound(cache_key)
+        if cached is not None:
+            cov, fp_hex_strings, readouts = cached
+            return (
+                cov,
+                tuple(fp_hex_strings),
+                tuple((name, tuple(tuple(m) for m in monomers)) for name, monomers in readouts),
+            )
+    except Exception as e:
+        logger.warning(f"compound cache read failed for key={cache_key}: {e}")
+
+    result = _run_compound_pipeline(smiles_canonical)
+
+    try:
+        save_cached_compound(cache_key, result)
+    except Exception as e:
+        logger.warning(f"compound cache write failed for key={cache_key}: {e}")
+
+    return result
+
+
+def _run_compound_pipeline(smiles_canonical: str) -> tuple[float, tuple[str, ...], tuple[tuple[str, tuple[tuple[str, str | None], ...]], ...]]:
+    """
+    Run RetroMol and fingerprinting for a canonical SMILES.
+
+    :param smiles_canonical: the canonical SMILES string of the compound
+    :return: tuple of (coverage, fingerprint hex strings, readouts as (name, ((monomer name, monomer smiles), ...)))
     """
+    from retromol.api import run_retromol
+    from retromol.io import Input as RetroMolInput
+    from retromol.readout import linear_readout as retromol_linear_readout
+
+    generator = _setup_fingerprint_generator()
+
     # Parse compound with RetroMol
-    input_data = RetroMolInput(cid="compound", repr=smiles)
+    input_data = RetroMolInput(cid="compound", repr=smiles_canonical)
     result = run_retromol(input_data)
 
     # Calculate coverage
@@ -92,172 +349,261 @@ def _compute_compound(generator: FingerprintGenerator, smiles: str) -> tuple[lis
 
     # Calculate linear readouts
     readout = retromol_linear_readout(result, require_identified=False)
-    linear_readouts = []
+    readouts = []
     for level_idx, level in enumerate(readout["levels"]):
         for path_idx, path in enumerate(level["strict_paths"]):
             ms = path["ordered_monomers"]
             if len(ms) <= 2: continue  # skip too short
-            ms_fwd = [
-                {
-                    "id": get_unique_identifier(),
-                    "name": m.get("identity", "unknown"),
-                    "displayName": None,
-                    "smiles": m.get("smiles", None),
-                }
-                for m in ms
-            ]
-            ms_rev = list(reversed(ms_fwd))
-            linear_readouts.append({
-                "id": get_unique_identifier(),
-                "name": f"level{level_idx}_path{path_idx}_fwd",
-                "sequence": ms_fwd,
-            })
-            linear_readouts.append({
-                "id": get_unique_identifier(),
-                "name": f"level{level_idx}_path{path_idx}_rev",
-                "sequence": ms_rev,
-            })
+            monomers = tuple((m.get("identity", "unknown"), m.get("smiles", None)) for m in ms)
+            readouts.append((f"level{level_idx}_path{path_idx}", monomers))
 
     # Generate fingerprints
     fps: np.ndarray = generator.fingerprint_from_result(result, num_bits=512, counted=False) # shape [N, 512] where N>=1
 
     # Convert fingerprints to hex strings
-    fp_hex_strings = [bits_to_hex(fp) for fp in fps] if len(fps) > 0 else [np.zeros((512,), dtype=bool)]
+    fp_hex_strings = tuple(bits_to_hex_batch(fps)) if len(fps) > 0 else (_EMPTY_FP_HEX,)
+
+    return cov, fp_hex_strings, tuple(readouts)
+
+
+def _compute_compound(smiles: str) -> tuple[list[float], list[str], list[dict]]:
+    """
+    Compute 512-bit fingerprint for a compound given its SMILES.
+
+    :param smiles: the SMILES string of the compound
+    :return: tuple of (list of coverage values, list of fingerprint hex strings, list of linear readouts)
+    """
+    cov, fp_hex_strings, readouts = _compute_compound_cached(_canonicalize_smiles(smiles))
+
+    # Draw all identifiers at once: one per monomer plus one per fwd/rev readout
+    ids = iter(get_unique_identifiers(sum(len(monomers) + 2 for _, monomers in readouts)))
+
+    linear_readouts = []
+    for name, monomers in readouts:
+        ms_fwd = [_readout_node(next(ids), monomer_name, monomer_smiles) for monomer_name, monomer_smiles in monomers]
+        ms_rev = ms_fwd[::-1]  # shares the node dicts of the forward readout
+        linear_readouts.append({
+            "id": next(ids),
+            "name": f"{name}_fwd",
+            "sequence": ms_fwd,
+        })
+        linear_readouts.append({
+            "id": next(ids),
+            "name": f"{name}_rev",
+            "sequence": ms_rev,
+        })
+
+    return [cov for _ in range(len(fp_hex_strings))], list(fp_hex_strings), linear_readouts
+
+
+def _run_compound_job(session_id: str, item_id: str, smiles: str) -> tuple[list[float], list[str], list[dict]]:
+    """
+    Job worker entry point for a compound item.
+
+    :param session_id: the session ID
+    :param item_id: the item ID
+    :param smiles: the SMILES string of the compound
+    :return: the result of `_compute_compound`
+    """
+    _mark_job_started(session_id, item_id)
+    return _compute_compound(smiles)
+
+
+def _store_item_error(session_id: str, item_id: str, error_message: str, ts_ms: int | None = None) -> None:
+    """
+    Mark an item as failed.
 
-    return [cov for _ in range(len(fp_hex_strings))], fp_hex_strings, linear_readouts
+    :param session_id: the session ID
+    :param item_id: the item ID
+    :param error_message: the error message to store on the item
+    :param ts_ms: optional update timestamp in milliseconds; defaults to now
+    """
+    update_item(session_id, item_id, _status_patch("error", error_message=error_message, ts_ms=ts_ms))
+
+
+def _store_job_result(
+    session_id: str,
+    item_id: str,
+    result: tuple[list[float], list[str], list[dict]],
+    ts_ms: int | None = None,
+) -> None:
+    """
+    Store the result of a job on its item and mark it as done, in one write.
 
+    The submitted name and input were already applied when the item was
+    marked as processing.
 
-def _compute_gene_cluster(generator: FingerprintGenerator, itemId: str, gbk_str: str) -> tuple[list[float], list[str], list[dict]]:
+    :param session_id: the session ID
+    :param item_id: the item ID
+    :param result: tuple of (list of scores, list of fingerprint hex strings, list of linear readouts)
+    :param ts_ms: optional update timestamp in milliseconds; defaults to now
+    """
+    scores, fp_hex_strings, linear_readout = result
+
+    # Set final status=done and store results on this item only
+    patch = _status_patch("done", ts_ms=ts_ms)
+    patch["fingerprints"] = [
+        {
+            "id": fp_id,
+            "fingerprint512": fp_hex,
+            "score": score,
+        }
+        for fp_id, score, fp_hex in zip(get_unique_identifiers(len(fp_hex_strings)), scores, fp_hex_strings, strict=True)
+    ]
+    patch["primarySequences"] = linear_readout
+    update_item(session_id, item_id, patch)
+
+
+def _process_target(
+    generator: "FingerprintGenerator",
+    target: Any,
+    tokenspecs: Any,
+    paras_model: object | None,
+    level: str,
+) -> tuple[float, str, list[list[tuple[str, str | None]]]]:
     """
-    Dummy function to compute a 512-bit fingerprint as a hex string (128 chars).
+    Compute the fingerprint and linear readouts of a single gene cluster target.
 
     :param generator: the fingerprint generator instance
+    :param target: the parsed target (region or candidate cluster)
+    :param tokenspecs: the tokenspecs to mine family tokens with
+    :param paras_model: the PARAS model, or None to let BioCracker load it
+    :param level: the readout level ('rec' or 'gene')
+    :return: tuple of (average prediction value, fingerprint hex string, list of readout sequences as (name, smiles) tuples)
+    """
+    from biocracker.readout import NRPSModuleReadout, PKSModuleReadout, linear_readouts as biocracker_linear_readouts
+    from biocracker.text_mining import mine_virtual_tokens
+
+    pred_vals = []
+    raw_kmers = []
+    sequences = []
+
+    # Mine for tokenspecs (i.e., family tokens)
+    for mined_tokenspec in mine_virtual_tokens(target, tokenspecs):
+        if token_name := COLLAPSE_LOOKUP.get(mined_tokenspec.get("token")):
+            raw_kmers.append([(token_name, None)])
+
+    # Extract module kmers
+    for readout in biocracker_linear_readouts(
+        target,
+        model=paras_model,
+        cache_dir_override=get_cache_dir(),
+        level=level,
+        pred_threshold=0.1
+    ):
+        kmer, linear_readout = [], []
+        for module in readout["readout"]:
+            if isinstance(module, PKSModuleReadout) and (letter := PKS_MAP.get(module.module_type)):
+                kmer.append((letter, None))
+                pred_vals.append(1.0)
+                linear_readout.append((letter, None))
+            elif isinstance(module, NRPSModuleReadout):
+                substrate_name = module.get("substrate_name", None)
+                substrate_smiles = module.get("substrate_smiles", None)
+                substrate_score = module.get("score", 0.0)
+                kmer.append((substrate_name, substrate_smiles))
+                pred_vals.append(substrate_score)
+                linear_readout.append((substrate_name or "unknown", substrate_smiles))
+            else:
+                raise ValueError("Unknown module readout type")
+
+        if len(kmer) > 0:
+            raw_kmers.append(kmer)
+
+        if len(linear_readout) >= 2:  # skip too short
+            sequences.append(linear_readout)
+
+    # Mine for kmers of lengths 1 to 3
+    kmers = kmers_batch(raw_kmers, (1, 2, 3))
+
+    # Generate fingerprint
+    fp: np.ndarray = generator.fingerprint_from_kmers(kmers, num_bits=512, counted=False)
+
+    # Convert to hex string
+    fp_hex_string = bits_to_hex(fp)
+
+    # Calculate average prediction value
+    avg_pred_val = float(np.mean(pred_vals)) if len(pred_vals) > 0 else 0.0
+
+    return avg_pred_val, fp_hex_string, sequences
+
+
+def _compute_gene_cluster(itemId: str, gbk_str: str) -> tuple[list[float], list[str], list[dict]]:
+    """
+    Compute 512-bit fingerprints for the targets in a gene cluster GenBank file.
+
+    Runs in a process-pool worker, so that parsing, PARAS predictions and
+    fingerprinting of gene clusters use all cores like compound jobs do.
+
     :param itemId: the ID of the gene cluster item
     :param gbk_str: the GenBank file content as a string
     :return: tuple of (list of average prediction values, list of fingerprint hex strings, list of linear readouts)
     """
-    # Write gbk_str to a temporary file
-    with tempfile.NamedTemporaryFile(delete=True, suffix=".gbk") as temp_gbk_file:
-        temp_gbk_file.write(gbk_str.encode("utf-8"))
-        temp_gbk_file.flush()
-        gbk_path = temp_gbk_file.name
+    from biocracker.antismash import parse_region_gbk_file
+    from biocracker.text_mining import get_default_tokenspecs
 
-        # Configure tokenspecs
-        tokenspecs = get_default_tokenspecs()
+    # Write gbk_str to a temporary file; the parser only accepts a path. The file
+    # is written in one unbuffered call and closed before it is parsed
+    fd, gbk_path = tempfile.mkstemp(suffix=".gbk")
+    try:
+        try:
+            os.write(fd, gbk_str.encode("utf-8"))
+        finally:
+            os.close(fd)
 
         # Parse gene cluster file
         targets = parse_region_gbk_file(gbk_path, top_level="cand_cluster")  # 'region' or 'cand_cluster' top level
+    finally:
+        os.unlink(gbk_path)
+
+    # Nothing to fingerprint; skip loading tokenspecs, generator and PARAS model
+    if not targets:
+        return [], [], []
+
+    # Configure tokenspecs
+    tokenspecs = get_default_tokenspecs()
+
+    generator = _setup_fingerprint_generator()
+
+    # Optionally load PARAS model; cached per worker process
+    paras_model = get_paras_model()
 
     # Generate readouts
     level = "gene"  # 'rec' or 'gene' level
-    avg_pred_vals, fps, linear_readouts = [], [], []
+    avg_pred_vals, fps, sequences = [], [], []
     for target in targets:
-        pred_vals = []
-        raw_kmers = []
-
-        # Mine for tokenspecs (i.e., family tokens)
-        for mined_tokenspec in mine_virtual_tokens(target, tokenspecs):
-            if token_spec := mined_tokenspec.get("token"):
-                for token_name, values in COLLAPSE_BY_NAME.items():
-                    if token_spec in values:
-                        raw_kmers.append([(token_name, None)])
-
-        # Optionally load PARAS model
-        paras_model = get_paras_model()
-
-        # Extract module kmers
-        for readout in biocracker_linear_readouts(
-            target,
-            model=paras_model,
-            cache_dir_override=get_cache_dir(),
-            level=level,
-            pred_threshold=0.1
-        ):
-            kmer, linear_readout = [], []
-            for module in readout["readout"]:
-                match module:
-                    case PKSModuleReadout(module_type="PKS_A") as m:
-                        kmer.append(("A", None))
-                        pred_vals.append(1.0)
-                        linear_readout.append({
-                            "id": get_unique_identifier(),
-                            "name": "A",
-                            "displayName": None,
-                            "smiles": None,
-                        })
-                    case PKSModuleReadout(module_type="PKS_B") as m:
-                        kmer.append(("B", None))
-                        pred_vals.append(1.0)
-                        linear_readout.append({
-                            "id": get_unique_identifier(),
-                            "name": "B",
-                            "displayName": None,
-                            "smiles": None,
-                        })
-                    case PKSModuleReadout(module_type="PKS_C") as m:
-                        kmer.append(("C", None))
-                        pred_vals.append(1.0)
-                        linear_readout.append({
-                            "id": get_unique_identifier(),
-                            "name": "C",
-                            "displayName": None,
-                            "smiles": None,
-                        })
-                    case PKSModuleReadout(module_type="PKS_D") as m:
-                        kmer.append(("D", None))
-                        pred_vals.append(1.0)
-                        linear_readout.append({
-                            "id": get_unique_identifier(),
-                            "name": "D",
-                            "displayName": None,
-                            "smiles": None,
-                        })
-                    case NRPSModuleReadout() as m:
-                        substrate_name = m.get("substrate_name", None)
-                        substrate_smiles = m.get("substrate_smiles", None)
-                        substrate_score = m.get("score", 0.0)
-                        kmer.append((substrate_name, substrate_smiles))
-                        pred_vals.append(substrate_score)
-                        linear_readout.append({
-                            "id": get_unique_identifier(),
-                            "name": substrate_name or "unknown",
-                            "displayName": None,
-                            "smiles": substrate_smiles,
-                        })
-                    case _: raise ValueError("Unknown module readout type")
-
-            if len(kmer) > 0:
-                raw_kmers.append(kmer)
-
-            if len(linear_readout) >= 2:  # skip too short
-                linear_readouts.append({
-                    "id": get_unique_identifier(),
-                    "name": f"{itemId}_readout_{len(linear_readouts)+1}",
-                    "sequence": linear_readout,
-                })
-
-        # Mine for kmers of lengths 1 to 3
-        kmers = []
-        kmer_lengths = [1, 2, 3]
-        for k in kmer_lengths:
-            for raw_kmer in raw_kmers:
-                kmers.extend(kmerize_sequence(raw_kmer, k))
-
-        # Generate fingerprint
-        fp: np.ndarray = generator.fingerprint_from_kmers(kmers, num_bits=512, counted=False)
-
-        # Convert to hex string
-        fp_hex_string = bits_to_hex(fp)
-
-        # Calculate average prediction value
-        avg_pred_val = float(np.mean(pred_vals)) if len(pred_vals) > 0 else 0.0
-        
+        avg_pred_val, fp_hex_string, target_sequences = _process_target(generator, target, tokenspecs, paras_model, level)
         avg_pred_vals.append(avg_pred_val)
         fps.append(fp_hex_string)
+        sequences.extend(target_sequences)
+
+    # Build readout dicts once at the end, drawing all identifiers at once
+    ids = iter(get_unique_identifiers(sum(len(sequence) + 1 for sequence in sequences)))
+    linear_readouts = [
+        {
+            "id": next(ids),
+            "name": f"{itemId}_readout_{idx}",
+            "sequence": [_readout_node(next(ids), name, smiles) for name, smiles in sequence],
+        }
+        for idx, sequence in enumerate(sequences, start=1)
+    ]
 
     return avg_pred_vals, fps, linear_readouts
 
 
+def _run_gene_cluster_job(session_id: str, item_id: str, gbk_str: str) -> tuple[list[float], list[str], list[dict]]:
+    """
+    Job worker entry point for a gene cluster item.
+
+    :param session_id: the session ID
+    :param item_id: the item ID
+    :param gbk_str: the GenBank file content as a string
+    :return: the result of `_compute_gene_cluster`
+    """
+    _mark_job_started(session_id, item_id)
+    return _compute_gene_cluster(item_id, gbk_str)
+
+
 @blp_submit_compound.post("/api/submitCompound")
 def submit_compound() -> tuple[dict[str, str], int]:
     """
@@ -271,27 +617,26 @@ def submit_compound() -> tuple[dict[str, str], int]:
 
     :return: a tuple containing a JSON response and HTTP status code
     """
-    payload = request.get_json(force=True) or {}
+    try:
+        req = msgspec.json.decode(request.get_data(), type=SubmitCompoundRequest)
+    except msgspec.MsgspecError as e:
+        current_app.logger.warning(f"submit_compound: invalid request body: {e}")
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
 
-    session_id = payload.get("sessionId")
-    item_id = payload.get("itemId")
-    name = payload.get("name")
-    smiles = payload.get("smiles")
+    session_id = req.sessionId
+    item_id = req.itemId
+    name = req.name
+    smiles = req.smiles
 
     current_app.logger.info(f"submit_compound called: session_id={session_id} item_id={item_id}")
-
-    if not session_id or not item_id:
-        current_app.logger.warning("submit_compound: missing sessionId or itemId")
-        return jsonify({"error": "Missing sessionId or itemId"}), 400
     
-    # Validate session + item exists and kind is correct
-    full_sess = load_session_with_items(session_id)
-    if full_sess is None:
-        current_app.logger.warning(f"submit_compound: session not found: {session_id}")
-        return jsonify({"error": "Session not found"}), 404
-    
-    item = next((it for it in full_sess.get("items", []) if it.get("id") == item_id), None)
+    # Validate session + item exists and kind is correct; only the item itself
+    # is loaded, the session is consulted only to tell the two 404s apart
+    item = load_item(session_id, item_id)
     if item is None:
+        if load_session_meta(session_id) is None:
+            current_app.logger.warning(f"submit_compound: session not found: {session_id}")
+            return jsonify({"error": "Session not found"}), 404
         current_app.logger.warning(f"submit_compound: item not found: {item_id}")
         return jsonify({"error": "Item not found"}), 404
     
@@ -299,70 +644,148 @@ def submit_compound() -> tuple[dict[str, str], int]:
         current_app.logger.warning(f"submit_compound: wrong kind={item.get('kind')}")
         return jsonify({"error": "Item is not a compound"}), 400
 
-    t0 = time.time()
+    t0 = time.monotonic_ns()
+
+    # Set status=queued on this item only; the worker sets status=processing
+    # when it starts the job
+    patch = _status_patch("queued")
+    if name:
+        patch["name"] = name
+    if smiles:
+        patch["smiles"] = smiles
 
-    # Set status=processing early on this item only
-    def mark_processing(it: dict) -> None:
+    patch_loaded_item(session_id, item, patch)
+    
+    logger = current_app.logger
+
+    def on_finished(future: Future) -> None:
         """
-        Update item details and mark as processing.
+        Store the job result (or error) on the item once the job has finished.
 
-        :param it: the item dictionary to update
+        :param future: the finished job future
         """
-        it["name"] = name or it.get("name")
-        it["smiles"] = smiles or it.get("smiles")
-        _set_item_status_inplace(it, "processing")
-
-    ok = update_item(session_id, item_id, mark_processing)
-    if not ok:
-        current_app.logger.warning(f"submit_compound: failed to mark item as processing: {item_id}")
-        return jsonify({"error": "Item not found during update"}), 404
-    
-    try:
-        # Heavy work
-        generator = _setup_fingerprint_generator()
-        coverages, fp_hex_strings, linear_readout = _compute_compound(generator, smiles)
-
-        # Set final status=done and store results on this item only
-        def mark_done(it: dict) -> None:
-            it["name"] = name or it.get("name")
-            it["smiles"] = smiles or it.get("smiles")
-            it["fingerprints"] = [
-                {
-                    "id": get_unique_identifier(),
-                    "fingerprint512": fp_hex,
-                    "score": cov,
-                }
-                for cov, fp_hex in zip(coverages, fp_hex_strings, strict=True)
-            ]
-            it["primarySequences"] = linear_readout
-            _set_item_status_inplace(it, "done")
-
-        update_item(session_id, item_id, mark_done)
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.exception(f"submit_compound: error for item_id={item_id}")
+            _store_item_error(session_id, item_id, str(e))
+            return
+
+        _store_job_result(session_id, item_id, result)
+
+        elapsed = (time.monotonic_ns() - t0) // 1_000_000
+        logger.info(f"submit_compound: finished item_id={item_id} elapsed_ms={elapsed}")
 
+    try:
+        # Heavy work; RetroMol is CPU-bound so it runs in a separate process
+        future = _submit_job(_run_compound_job, session_id, item_id, smiles)
     except Exception as e:
-        current_app.logger.exception(f"submit_compound: error for item_id={item_id}")
+        current_app.logger.exception(f"submit_compound: failed to schedule item_id={item_id}")
+        _store_item_error(session_id, item_id, str(e))
+        return jsonify({"ok": False, "status": "error", "error": str(e)}), 500
+
+    future.add_done_callback(on_finished)
 
-        def mark_error(it: dict) -> None:
-            _set_item_status_inplace(it, "error", error_message=str(e))
+    return jsonify({
+        "ok": True,
+        "status": "queued",
+        "jobId": item_id,
+    }), 202
 
-        update_item(session_id, item_id, mark_error)
 
-        elapsed = int((time.time() - t0) * 1000)
-        return jsonify({
-            "ok": False,
-            "status": "error",
-            "elapsed_ms": elapsed,
-            "error": str(e),
-        }), 500
-    
-    elapsed = int((time.time() - t0) * 1000)
-    current_app.logger.info(f"submit_compound: finished item_id={item_id} elapsed_ms={elapsed}")
+@blp_submit_compound_batch.post("/api/submitCompoundBatch")
+def submit_compound_batch() -> tuple[dict[str, str], int]:
+    """
+    Endpoint to submit multiple compounds of one session for processing.
+
+    Items are validated and queued in one request, and every compound runs as
+    its own job, so each result is stored as soon as it is ready.
+
+    Expected JSON body:
+      - sessionId: str
+      - items: list of objects with
+        - itemId: str
+        - name: str
+        - smiles: str
+
+    :return: a tuple containing a JSON response and HTTP status code
+    """
+    try:
+        req = msgspec.json.decode(request.get_data(), type=SubmitCompoundBatchRequest)
+    except msgspec.MsgspecError as e:
+        current_app.logger.warning(f"submit_compound_batch: invalid request body: {e}")
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
+
+    session_id = req.sessionId
+    entries = req.items
+
+    current_app.logger.info(f"submit_compound_batch called: session_id={session_id} n_items={len(entries)}")
+
+    if load_session_meta(session_id) is None:
+        current_app.logger.warning(f"submit_compound_batch: session not found: {session_id}")
+        return jsonify({"error": "Session not found"}), 404
+
+    # Validate all items before marking any of them as processing
+    items = []
+    for entry in entries:
+        item = load_item(session_id, entry.itemId)
+        if item is None:
+            current_app.logger.warning(f"submit_compound_batch: item not found: {entry.itemId}")
+            return jsonify({"error": "Item not found", "itemId": entry.itemId}), 404
+        if item.get("kind") != "compound":
+            current_app.logger.warning(f"submit_compound_batch: wrong kind={item.get('kind')}")
+            return jsonify({"error": "Item is not a compound", "itemId": entry.itemId}), 400
+        items.append(item)
+
+    t0 = time.monotonic_ns()
+
+    # Set status=queued on these items only, with one shared timestamp; each
+    # worker sets status=processing when it starts the job of its item
+    ts_ms = time.time_ns() // 1_000_000
+    for entry, item in zip(entries, items, strict=True):
+        patch = _status_patch("queued", ts_ms=ts_ms)
+        if entry.name:
+            patch["name"] = entry.name
+        if entry.smiles:
+            patch["smiles"] = entry.smiles
+
+        patch_loaded_item(session_id, item, patch)
+
+    logger = current_app.logger
+
+    def on_finished(entry: SubmitCompoundBatchEntry, future: Future) -> None:
+        """
+        Store the job result (or error) on its item once the job has finished.
+
+        :param entry: the batch entry processed by the job
+        :param future: the finished job future
+        """
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"submit_compound_batch: error for item_id={entry.itemId}: {e}")
+            _store_item_error(session_id, entry.itemId, str(e))
+            return
+
+        _store_job_result(session_id, entry.itemId, result)
+
+        elapsed = (time.monotonic_ns() - t0) // 1_000_000
+        logger.info(f"submit_compound_batch: finished item_id={entry.itemId} elapsed_ms={elapsed}")
+
+    for entry in entries:
+        try:
+            future = _submit_job(_run_compound_job, session_id, entry.itemId, entry.smiles)
+        except Exception as e:
+            current_app.logger.exception(f"submit_compound_batch: failed to schedule item_id={entry.itemId}")
+            _store_item_error(session_id, entry.itemId, str(e))
+            continue
+        future.add_done_callback(lambda f, entry=entry: on_finished(entry, f))
 
     return jsonify({
         "ok": True,
-        "status": "done",
-        "elapsed_ms": elapsed,
-    }), 200
+        "status": "queued",
+        "jobIds": [e.itemId for e in entries],
+    }), 202
 
 
 @blp_submit_gene_cluster.post("/api/submitGeneCluster")
@@ -378,27 +801,26 @@ def submit_gene_cluster()  -> tuple[dict[str, str], int]:
 
     :return: a tuple containing a JSON response and HTTP status code
     """
-    payload = request.get_json(force=True) or {}
+    try:
+        req = msgspec.json.decode(request.get_data(), type=SubmitGeneClusterRequest)
+    except msgspec.MsgspecError as e:
+        current_app.logger.warning(f"submit_gene_cluster: invalid request body: {e}")
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
 
-    session_id = payload.get("sessionId")
-    item_id = payload.get("itemId")
-    name = payload.get("name")
-    file_content = payload.get("fileContent")
+    session_id = req.sessionId
+    item_id = req.itemId
+    name = req.name
+    file_content = req.fileContent
 
     current_app.logger.info(f"submit_gene_cluster called: session_id={session_id} item_id={item_id}")
-
-    if not session_id or not item_id:
-        current_app.logger.warning("submit_gene_cluster: missing sessionId or itemId")
-        return jsonify({"error": "Missing sessionId or itemId"}), 400
     
-    # Validate session + item exists and kind is correct
-    full_sess = load_session_with_items(session_id)
-    if full_sess is None:
-        current_app.logger.warning(f"submit_gene_cluster: session not found: {session_id}")
-        return jsonify({"error": "Session not found"}), 404
-    
-    item = next((it for it in full_sess.get("items", []) if it.get("id") == item_id), None)
+    # Validate session + item exists and kind is correct; only the item itself
+    # is loaded, the session is consulted only to tell the two 404s apart
+    item = load_item(session_id, item_id)
     if item is None:
+        if load_session_meta(session_id) is None:
+            current_app.logger.warning(f"submit_gene_cluster: session not found: {session_id}")
+            return jsonify({"error": "Session not found"}), 404
         current_app.logger.warning(f"submit_gene_cluster: item not found: {item_id}")
         return jsonify({"error": "Item not found"}), 404
     
@@ -406,67 +828,50 @@ def submit_gene_cluster()  -> tuple[dict[str, str], int]:
         current_app.logger.warning(f"submit_gene_cluster: wrong kind={item.get('kind')}")
         return jsonify({"error": "Item is not a gene cluster"}), 400
 
-    t0 = time.time()
+    t0 = time.monotonic_ns()
+
+    # Set status=queued on this item only; the worker sets status=processing
+    # when it starts the job
+    patch = _status_patch("queued")
+    if name:
+        patch["name"] = name
+    if file_content:
+        patch["fileContent"] = file_content
 
-    # Set status=processing early on this item only
-    def mark_processing(it: dict) -> None:
+    patch_loaded_item(session_id, item, patch)
+
+    logger = current_app.logger
+
+    def on_finished(future: Future) -> None:
         """
-        Update item details and mark as processing.
+        Store the job result (or error) on the item once the job has finished.
 
-        :param it: the item dictionary to update
+        :param future: the finished job future
         """
-        it["name"] = name or it.get("name")
-        it["fileContent"] = file_content or it.get("fileContent")
-        _set_item_status_inplace(it, "processing")
-    
-    ok = update_item(session_id, item_id, mark_processing)
-    if not ok:
-        current_app.logger.warning(f"submit_gene_cluster: failed to mark item as processing: {item_id}")
-        return jsonify({"error": "Item not found during update"}), 404
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.exception(f"submit_gene_cluster: error for item_id={item_id}")
+            _store_item_error(session_id, item_id, str(e))
+            return
 
-    try:
-        # Heavy work
-        generator = _setup_fingerprint_generator()
-        scores, fp_hex_strings, readout = _compute_gene_cluster(generator, item_id, file_content)
-        
-        # Set final status=done and store results on this item only
-        def mark_done(it: dict) -> None:
-            it["name"] = name or it.get("name")
-            it["fileContent"] = file_content or it.get("fileContent")
-            it["fingerprints"] = [
-                {
-                    "id": get_unique_identifier(),
-                    "fingerprint512": fp_hex,
-                    "score": score,
-                }
-                for idx, (score, fp_hex) in enumerate(zip(scores, fp_hex_strings, strict=True), start=1)
-            ]
-            it["primarySequences"] = readout
-            _set_item_status_inplace(it, "done")
-
-        update_item(session_id, item_id, mark_done)
+        _store_job_result(session_id, item_id, result)
+
+        elapsed = (time.monotonic_ns() - t0) // 1_000_000
+        logger.info(f"submit_gene_cluster: finished item_id={item_id} elapsed_ms={elapsed}")
 
+    try:
+        # Heavy work; parsing and PARAS predictions are CPU-bound so they run in a separate process
+        future = _submit_job(_run_gene_cluster_job, session_id, item_id, file_content)
     except Exception as e:
-        current_app.logger.exception(f"submit_gene_cluster: error for item_id={item_id}")
-
-        def mark_error(it: dict) -> None:
-            _set_item_status_inplace(it, "error", error_message=str(e))
-        
-        update_item(session_id, item_id, mark_error)
-        
-        elapsed = int((time.time() - t0) * 1000)
-        return jsonify({
-            "ok": False,
-            "status": "error",
-            "elapsed_ms": elapsed,
-            "error": str(e),
-        }), 500
-    
-    elapsed = int((time.time() - t0) * 1000)
-    current_app.logger.info(f"submit_gene_cluster: finished item_id={item_id} elapsed_ms={elapsed}")
+        current_app.logger.exception(f"submit_gene_cluster: failed to schedule item_id={item_id}")
+        _store_item_error(session_id, item_id, str(e))
+        return jsonify({"ok": False, "status": "error", "error": str(e)}), 500
+
+    future.add_done_callback(on_finished)
 
     return jsonify({
         "ok": True,
-        "status": "done",
-        "elapsed_ms": elapsed,
-    }), 200
+        "status": "queued",
+        "jobId": item_id,
+    }), 202
@@ -1,9 +1,9 @@
 """Module for loading and caching machine learning models used in the application."""
 
 from pathlib import Path
+import logging
 import os
 
-from flask import current_app
 import joblib
 
 
@@ -11,6 +11,9 @@ CACHE_DIR = os.environ.get("CACHE_DIR", "/app/cache")
 PARAS_MODEL_PATH = os.environ.get("PARAS_MODEL_PATH", None)
 _model_cache: dict[str, object | None] = {}
 
+# Models are loaded inside job worker processes, outside of any app context
+logger = logging.getLogger(__name__)
+
 
 # Make sure cache directory exists
 os.makedirs(CACHE_DIR, exist_ok=True)
@@ -40,13 +43,13 @@ def get_paras_model() -> object | None:
         # Model path is defined; attempt to load the model
         path = Path(PARAS_MODEL_PATH)
         if path.is_file():
-            current_app.logger.info(f"Loading PARAS model from {path}")
+            logger.info(f"Loading PARAS model from {path}")
             _model_cache["paras"] = joblib.load(path)
         else:
-            current_app.logger.warning(f"PARAS model not found at {path}; letting BioCracker download into {CACHE_DIR}")
+            logger.warning(f"PARAS model not found at {path}; letting BioCracker download into {CACHE_DIR}")
             _model_cache["paras"] = None
         return _model_cache["paras"]
     else:
         # Model path is not defined
-        current_app.logger.warning("PARAS_MODEL_PATH not set; letting BioCracker download into CACHE_DIR")
+        logger.warning("PARAS_MODEL_PATH not set; letting BioCracker download into CACHE_DIR")
         return None
@@ -1,11 +1,16 @@
 """Module for defining database query endpoints."""
 
+import atexit
 import os
+import threading
 import time
+from collections.abc import Iterator
+from functools import lru_cache
 
 import psycopg
 from flask import Blueprint, request, jsonify
-from psycopg import sql
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 from pgvector.psycopg import register_vector
 
 from routes.query_registry import QUERIES
@@ -18,6 +23,17 @@ blp = Blueprint("query", __name__)
 DEFAULT_LIMIT = 500
 MAX_OFFSET = 50_000
 STATEMENT_TIMEOUT_MS = 3000  # 3 seconds
+POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX", "10"))
+POOL_TIMEOUT_S = 5.0  # max wait for a free connection
+HNSW_EF_SEARCH = 100  # candidate list size for approximate nearest-neighbour scans
+PREPARE_THRESHOLD = 1  # server-side prepare statements from their second execution
+MAX_BATCH_QUERIES = 16  # max named queries per /api/queryBatch request
+RESULT_CACHE_MAX_SIZE = 512  # max cached results for queries with a `cache_ttl`
+STREAM_ITERSIZE = 2000  # rows per server-side cursor fetch in `iter_named_query`
+
+# Converters for the parameter types used in the query registry; other types pass through as-is
+_CONVERTERS = {float: float, int: int, str: str}
 
 
 def dsn_from_env() -> str:
@@ -37,7 +53,144 @@ def dsn_from_env() -> str:
     return f"postgresql://{user}:{pwd}@{host}:{port}/{name}"
 
 
-def coerce_params(spec: dict[str, type], data: dict) -> tuple[dict, str | None]:
+# Query connection pool; created lazily on first query so that a misconfigured
+# database does not prevent the app from starting
+_POOL: ConnectionPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    """
+    Get the connection pool used for named queries, creating it if needed.
+
+    Connections are read-only in practice (read-only role), have a short
+    statement timeout, use the public schema and have pgvector registered.
+
+    :return: the query connection pool
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ConnectionPool(
+                    dsn_from_env(),
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT_S,
+                    kwargs={
+                        "options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS} "
+                                   f"-c idle_in_transaction_session_timeout={STATEMENT_TIMEOUT_MS} "
+                                   f"-c search_path=public "
+                                   # Let HNSW index scans continue until the candidate LIMIT is met
+                                   f"-c hnsw.ef_search={HNSW_EF_SEARCH} "
+                                   f"-c hnsw.iterative_scan=strict_order",
+                        # Statement text is constant per query/order (see `_build_stmt`),
+                        # so psycopg's per-connection prepared statement cache can hit
+                        "prepare_threshold": PREPARE_THRESHOLD,
+                    },
+                    configure=register_vector,
+                    open=True,
+                )
+                atexit.register(_POOL.close)
+    return _POOL
+
+
+# Results of queries marked with a `cache_ttl` in the registry, keyed on the
+# rendered query inputs; values are (expiry as monotonic seconds, result)
+_RESULT_CACHE: dict[tuple, tuple[float, dict]] = {}
+_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(key: tuple) -> dict | None:
+    """
+    Get a cached query result if present and not expired.
+
+    :param key: the cache key
+    :return: the cached result, or None
+    """
+    with _RESULT_CACHE_LOCK:
+        hit = _RESULT_CACHE.get(key)
+        if hit is None:
+            return None
+        if hit[0] <= time.monotonic():
+            del _RESULT_CACHE[key]
+            return None
+        return hit[1]
+
+
+def _cache_put(key: tuple, result: dict, ttl: float) -> None:
+    """
+    Cache a query result for `ttl` seconds, evicting the oldest entry when full.
+
+    :param key: the cache key
+    :param result: the query result
+    :param ttl: time to live in seconds
+    """
+    with _RESULT_CACHE_LOCK:
+        if key not in _RESULT_CACHE and len(_RESULT_CACHE) >= RESULT_CACHE_MAX_SIZE:
+            del _RESULT_CACHE[next(iter(_RESULT_CACHE))]
+        _RESULT_CACHE[key] = (time.monotonic() + ttl, result)
+
+
+def _quote_ident(ident: str) -> str:
+    """
+    Quote a SQL identifier the way Postgres expects it.
+
+    :param ident: the identifier to quote
+    :return: the double-quoted identifier
+    """
+    return '"' + ident.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=64)
+def _build_stmt(name: str, order_col: str, order_dir: str) -> str:
+    """
+    Render the final statement for a named query and ordering.
+
+    The result only depends on these three (whitelisted) inputs, so it is
+    memoized and rendered without a database connection.
+
+    :param name: the name of the predefined query
+    :param order_col: the whitelisted column to order by
+    :param order_dir: the order direction, 'ASC' or 'DESC'
+    :return: the statement with LIMIT/OFFSET placeholders
+    """
+    base_sql = QUERIES[name]["sql"].rstrip().rstrip(";")
+    return (
+        base_sql.format(order_col=_quote_ident(order_col), order_dir=order_dir)
+        + " LIMIT %(limit)s OFFSET %(offset)s"
+    )
+
+
+def coerce_value(k: str, typ: type | tuple, v: object) -> object:
+    """
+    Coerce a single parameter value according to its spec.
+
+    :param k: the parameter name, used in error messages
+    :param typ: the expected type, or a (list, element type, max length) tuple for arrays
+    :param v: the input value
+    :return: the coerced value
+    :raises ValueError: if the value cannot be coerced or the array is too long
+    """
+    if isinstance(typ, tuple):
+        _, elem_typ, max_len = typ
+        if not isinstance(v, list):
+            raise ValueError(f"Invalid type for {k}")
+        if len(v) > max_len:
+            raise ValueError(f"Too many values for {k} (max {max_len})")
+        try:
+            return [elem_typ(x) for x in v]
+        except Exception:
+            raise ValueError(f"Invalid type for {k}")
+
+    conv = _CONVERTERS.get(typ)
+    try:
+        return conv(v) if conv else v
+    except Exception:
+        raise ValueError(f"Invalid type for {k}")
+
+
+def coerce_params(spec: dict[str, type | tuple], data: dict) -> tuple[dict, str | None]:
     """
     Coerce and validate parameters from the request data according to the spec.
 
@@ -49,34 +202,31 @@ def coerce_params(spec: dict[str, type], data: dict) -> tuple[dict, str | None]:
     for k, typ in spec.items():
         if k not in data:
             return {}, f"Missing param: {k}"
-        v = data[k]
         try:
-            if typ is float: out[k] = float(v)
-            elif typ is int: out[k] = int(v)
-            elif typ is str: out[k] = str(v)
-            else: out[k] = v
-        except Exception:
-            return {}, f"Invalid type for {k}"
+            out[k] = coerce_value(k, typ, data[k])
+        except ValueError as e:
+            return {}, str(e)
     return out, None
 
 
-def execute_named_query(
+def _prepare_named_query(
     name: str,
     params: dict | None = None,
     paging: dict | None = None,
     order: dict | None = None,
-) -> dict:
+    max_array_len: int | None = None,
+) -> tuple[str, dict, tuple | None, float | None]:
     """
-    Execute a predefined database query with parameters, paging, and ordering.
+    Validate the inputs of a predefined database query and render its statement.
 
     :param name: the name of the predefined query
     :param params: a dictionary of query parameters
     :param paging: a dictionary with 'limit' and 'offset' for paging
     :param order: a dictionary with 'column' and 'dir' for ordering
-    :return: a dictionary with query results
+    :param max_array_len: optional override of the max length of array params
+    :return: a tuple with the rendered statement, the typed statement parameters,
+        and the result cache key and TTL (both None if the query is not cached)
     :raises ValueError: if there is a parameter validation error
-    :raises TimeoutError: if the query times out
-    :raises RuntimeError: if there is a database error
     """
     params = params or {}
     paging = paging or {}
@@ -90,19 +240,18 @@ def execute_named_query(
     # Validate required/optional params
     req_spec = qinfo.get("required", {})
     opt_spec = qinfo.get("optional", {})
+    if max_array_len is not None:
+        req_spec, opt_spec = (
+            {k: (typ[0], typ[1], max_array_len) if isinstance(typ, tuple) else typ for k, typ in spec.items()}
+            for spec in (req_spec, opt_spec)
+        )
     typed, err = coerce_params(req_spec, params)
     if err:
         raise ValueError(err)
     # Optional params (coerce if present)
     for k, typ in opt_spec.items():
         if k in params:
-            try:
-                if typ is float: typed[k] = float(params[k])
-                elif typ is int: typed[k] = int(params[k])
-                elif typ is str: typed[k] = str(params[k])
-                else: typed[k] = params[k]
-            except Exception:
-                raise ValueError(f"Invalid type for {k}")
+            typed[k] = coerce_value(k, typ, params[k])
             
     # Preprocess params for specific queries
     preprocess = qinfo.get("preprocess_params")
@@ -127,30 +276,67 @@ def execute_named_query(
     order_dir = (order.get("dir", qinfo.get("default_order_dir", "ASC")) if isinstance(order, dict) else qinfo.get("default_order_dir", "ASC"))
     order_dir = "DESC" if str(order_dir).upper().startswith("D") else "ASC"
 
-    # Render final SQL safely for the ORDER BY identifier
-    base_sql = qinfo["sql"]
-    rendered = (
-        base_sql.format(
-            order_col=sql.Identifier(order_col).as_string(psycopg.connect(dsn_from_env())),
-            order_dir=order_dir,
-        ).rstrip().rstrip(";")
-        + f" LIMIT %(limit)s OFFSET %(offset)s"
-    )
+    # Slowly-changing, parameter-free queries are served from the result cache
+    cache_ttl = qinfo.get("cache_ttl")
+    cache_key = (name, order_col, order_dir, tuple(sorted(typed.items()))) if cache_ttl else None
+
+    return _build_stmt(name, order_col, order_dir), typed, cache_key, cache_ttl
+
+
+def _make_result(name: str, cols: list[str], rows: list[dict], typed: dict, elapsed: int) -> dict:
+    """
+    Assemble the response payload of a named query.
 
-    # Exec (read-only, short timeout, public schema)
-    dsn = dsn_from_env()
+    :param name: the name of the predefined query
+    :param cols: the result column names
+    :param rows: the result rows as dictionaries
+    :param typed: the typed statement parameters, including limit and offset
+    :param elapsed: the execution time in milliseconds
+    :return: a dictionary with query results
+    """
+    return {
+        "name": name,
+        "columns": cols,
+        "rows": rows,
+        "rowCount": len(rows),
+        "limit": typed["limit"],
+        "offset": typed["offset"],
+        "elapsed_ms": elapsed,
+    }
+
+
+def execute_named_query(
+    name: str,
+    params: dict | None = None,
+    paging: dict | None = None,
+    order: dict | None = None,
+) -> dict:
+    """
+    Execute a predefined database query with parameters, paging, and ordering.
+
+    :param name: the name of the predefined query
+    :param params: a dictionary of query parameters
+    :param paging: a dictionary with 'limit' and 'offset' for paging
+    :param order: a dictionary with 'column' and 'dir' for ordering
+    :return: a dictionary with query results
+    :raises ValueError: if there is a parameter validation error
+    :raises TimeoutError: if the query times out
+    :raises RuntimeError: if there is a database error
+    """
+    rendered, typed, cache_key, cache_ttl = _prepare_named_query(name, params, paging, order)
+    if cache_key is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Exec (read-only, short timeout, public schema) on a pooled connection
     t0 = time.time()
     try:
-        with psycopg.connect(
-            dsn,
-            options=f"-c statement_timeout={STATEMENT_TIMEOUT_MS} "
-                    f"-c idle_in_transaction_session_timeout={STATEMENT_TIMEOUT_MS} "
-                    f"-c search_path=public",
-        ) as conn:
-            register_vector(conn)
-            with conn.cursor() as cur:
+        with _get_pool().connection() as conn:
+            # Rows are built as dicts while fetching; no intermediate tuples
+            with conn.cursor(row_factory=dict_row) as cur:
                 cur.execute(rendered, typed)
-                rows = cur.fetchall()
+                out_rows = cur.fetchall()
                 cols = [d.name for d in cur.description]
     except psycopg.errors.QueryCanceled:
         raise TimeoutError(f"Query timeout (>{STATEMENT_TIMEOUT_MS} ms)")
@@ -158,17 +344,122 @@ def execute_named_query(
         raise RuntimeError(f"Database error: {str(e)}")
     
     elapsed = int((time.time() - t0) * 1000)
-    out_rows = [dict(zip(cols, r)) for r in rows]
 
-    return {
-        "name": name,
-        "columns": cols,
-        "rows": out_rows,
-        "rowCount": len(out_rows),
-        "limit": limit,
-        "offset": offset,
-        "elapsed_ms": elapsed,
-    }
+    result = _make_result(name, cols, out_rows, typed, elapsed)
+    if cache_key is not None:
+        _cache_put(cache_key, result, cache_ttl)
+
+    return result
+
+
+def iter_named_query(
+    name: str,
+    params: dict | None = None,
+    paging: dict | None = None,
+    order: dict | None = None,
+    max_array_len: int | None = None,
+) -> Iterator[dict]:
+    """
+    Execute a predefined database query and yield its rows as they arrive.
+
+    Rows are fetched from a server-side cursor in batches of `STREAM_ITERSIZE`,
+    so large results are never held in memory at once. The result cache is
+    not used. The rows must be consumed promptly, because the connection is
+    held in an open transaction until the generator is exhausted or closed.
+
+    :param name: the name of the predefined query
+    :param params: a dictionary of query parameters
+    :param paging: a dictionary with 'limit' and 'offset' for paging
+    :param order: a dictionary with 'column' and 'dir' for ordering
+    :param max_array_len: optional override of the max length of array params,
+        for internal callers whose arrays are not taken from the request
+    :return: an iterator over the result rows as dictionaries
+    :raises ValueError: if there is a parameter validation error
+    :raises TimeoutError: if the query times out
+    :raises RuntimeError: if there is a database error
+    """
+    rendered, typed, _, _ = _prepare_named_query(name, params, paging, order, max_array_len)
+
+    try:
+        with _get_pool().connection() as conn:
+            with conn.cursor(name=f"stream_{name}", row_factory=dict_row) as cur:
+                cur.itersize = STREAM_ITERSIZE
+                cur.execute(rendered, typed)
+                yield from cur
+    except psycopg.errors.QueryCanceled:
+        raise TimeoutError(f"Query timeout (>{STATEMENT_TIMEOUT_MS} ms)")
+    except Exception as e:
+        raise RuntimeError(f"Database error: {str(e)}")
+
+
+def execute_named_queries(specs: list[dict]) -> list[dict]:
+    """
+    Execute several predefined database queries in one round trip.
+
+    All statements are sent on a single pooled connection in pipeline mode, so
+    the batch costs one network round trip instead of one per query.
+
+    :param specs: a list of dictionaries with 'name' and optional 'params', 'paging' and 'order'
+    :return: a list with the query results, in the order of `specs`
+    :raises ValueError: if there is a parameter validation error in any of the queries
+    :raises TimeoutError: if any of the queries times out
+    :raises RuntimeError: if there is a database error
+    """
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("Expected a non-empty list of queries")
+    if len(specs) > MAX_BATCH_QUERIES:
+        raise ValueError(f"Too many queries in batch (max {MAX_BATCH_QUERIES})")
+
+    prepared = []
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError("Each query must be an object")
+        prepared.append(_prepare_named_query(
+            spec.get("name"),
+            params=spec.get("params", {}),
+            paging=spec.get("paging", {}),
+            order=spec.get("order", {}),
+        ))
+
+    results: list[dict | None] = [None] * len(specs)
+    pending = []
+    for i, (_, _, cache_key, _) in enumerate(prepared):
+        cached = _cache_get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    if pending:
+        t0 = time.time()
+        try:
+            with _get_pool().connection() as conn:
+                with conn.pipeline():
+                    cursors = []
+                    for i in pending:
+                        rendered, typed, _, _ = prepared[i]
+                        cur = conn.cursor(row_factory=dict_row)
+                        cur.execute(rendered, typed)
+                        cursors.append(cur)
+                    # First fetch flushes the whole pipeline
+                    fetched = []
+                    for cur in cursors:
+                        fetched.append((cur.fetchall(), [d.name for d in cur.description]))
+                        cur.close()
+        except psycopg.errors.QueryCanceled:
+            raise TimeoutError(f"Query timeout (>{STATEMENT_TIMEOUT_MS} ms)")
+        except Exception as e:
+            raise RuntimeError(f"Database error: {str(e)}")
+
+        elapsed = int((time.time() - t0) * 1000)
+
+        for i, (out_rows, cols) in zip(pending, fetched):
+            _, typed, cache_key, cache_ttl = prepared[i]
+            results[i] = _make_result(specs[i]["name"], cols, out_rows, typed, elapsed)
+            if cache_key is not None:
+                _cache_put(cache_key, results[i], cache_ttl)
+
+    return results
 
 
 @blp.post("/api/query")
@@ -194,3 +485,27 @@ def run_query():
         return jsonify({"error": str(e)}), 400
     
     return jsonify(result), 200
+
+
+@blp.post("/api/queryBatch")
+def run_query_batch():
+    """
+    Run several predefined database queries in one request and one database round trip.
+
+    Expects a JSON body of the form `{"queries": [{"name", "params", "paging", "order"}, ...]}`.
+
+    :return: JSON response with a list of query results, or error message
+    """
+    payload = request.get_json(force=True) or {}
+    specs = payload.get("queries", [])
+
+    try:
+        results = execute_named_queries(specs)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 408
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"results": results}), 200
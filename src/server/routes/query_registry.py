@@ -1,11 +1,20 @@
 """Module defining the available SQL queries for the query registry."""
 
-
+import numpy as np
 from pgvector import Vector
 
 from routes.helpers import hex_to_bits
 
 
+# Max number of ids accepted in an array parameter; array params are declared
+# as (list, element type, max length)
+MAX_ARRAY_LEN = 10_000
+
+# Min number of nearest-neighbour candidates joined in cross-modal retrieval;
+# headroom for candidates that the joins drop (e.g. gene cluster fingerprints)
+CROSS_MODAL_MIN_CANDIDATES = 5_000
+
+
 def preprocess_cross_modal_params(typed: dict) -> dict:
     """
     Preprocess parameters for the cross-modal retrieval query.
@@ -15,12 +24,11 @@ def preprocess_cross_modal_params(typed: dict) -> dict:
     """
     fp_hex_string = typed["fingerprint512"]
     fp = hex_to_bits(fp_hex_string)
-    fp = [float(x) for x in fp]
-    typed["qv"] = Vector(fp)
+    typed["qv"] = Vector(fp.astype(np.float32))
 
     score_threshold = typed.get("querySettings", {}).get("scoreThreshold", 0.0)
-    print(score_threshold)
     typed["score_threshold"] = score_threshold
+    typed["min_candidates"] = CROSS_MODAL_MIN_CANDIDATES
 
     return typed
 
@@ -43,6 +51,7 @@ QUERIES = {
         "default_order_dir": "ASC",
         "required": {},
         "optional": {},
+        "cache_ttl": 60,  # seconds
     },
     "fingerprint_source_counts": {
         "sql": """
@@ -59,6 +68,7 @@ QUERIES = {
         "default_order_dir": "DESC",
         "required": {},
         "optional": {},
+        "cache_ttl": 60,  # seconds
     },
     "search_compound_by_name": {
         "sql": """
@@ -78,26 +88,43 @@ QUERIES = {
     "cross_modal_retrieval": {
         "sql": """
             SELECT
-                rf.id AS identifier,
+                nn.id AS identifier,
                 CASE
-                    WHEN rf.retromol_compound_id IS NOT NULL AND rf.biocracker_genbank_id IS NULL THEN 'compound'
-                    WHEN rf.biocracker_genbank_id IS NOT NULL AND rf.retromol_compound_id IS NULL THEN 'gene_cluster'
+                    WHEN nn.retromol_compound_id IS NOT NULL AND nn.biocracker_genbank_id IS NULL THEN 'compound'
+                    WHEN nn.biocracker_genbank_id IS NOT NULL AND nn.retromol_compound_id IS NULL THEN 'gene_cluster'
                     ELSE 'unknown'
                 END AS type,
                 cr.source AS source,
                 cr.ext_id AS ext_id,
                 cr.name AS name,
-                (1.0 - (rf.fp_retro_b512_vec_binary <=> %(qv)s)) AS score
-            FROM retrofingerprint AS rf
+                (1.0 - nn.dist) AS score
+            FROM (
+                -- Nearest neighbours within the score threshold, served by the
+                -- HNSW index on the fingerprint column (see db/init/03_indexes.sql).
+                -- Approximate: the index scan may miss true neighbours, and only
+                -- the nearest candidates are joined (at least `min_candidates`,
+                -- more for deep pages); rows the joins drop are not replaced
+                SELECT
+                    rf.id,
+                    rf.retromol_compound_id,
+                    rf.biocracker_genbank_id,
+                    (rf.fp_retro_b512_vec_binary <=> %(qv)s) AS dist
+                FROM retrofingerprint AS rf
+                WHERE vector_norm(rf.fp_retro_b512_vec_binary) > 0
+                -- Cosine distance is undefined for an all-zero query, which
+                -- then matches nothing; only references the parameter, so it
+                -- is a one-time filter that skips the scan entirely
+                AND vector_norm(%(qv)s) > 0
+                AND (rf.fp_retro_b512_vec_binary <=> %(qv)s) <= 1.0 - %(score_threshold)s
+                ORDER BY rf.fp_retro_b512_vec_binary <=> %(qv)s
+                LIMIT GREATEST(%(limit)s::bigint + %(offset)s::bigint, %(min_candidates)s::bigint)
+            ) AS nn
             JOIN retromol_compound rmc
-            ON rmc.id = rf.retromol_compound_id
+            ON rmc.id = nn.retromol_compound_id
             JOIN compound c
             ON c.id = rmc.compound_id
             LEFT join compound_record cr
             ON cr.compound_id = c.id
-            WHERE vector_norm(rf.fp_retro_b512_vec_binary) > 0
-            AND vector_norm(%(qv)s) > 0
-            AND (1.0 - (rf.fp_retro_b512_vec_binary <=> %(qv)s)) >= %(score_threshold)s
             ORDER BY {order_col} {order_dir}
         """,
         "allowed_order_cols": {"identifier", "name", "source", "ext_id", "score"},
@@ -148,6 +175,7 @@ QUERIES = {
         "default_order_dir": "DESC",
         "required": {},
         "optional": {},
+        "cache_ttl": 300,  # seconds; background universe, changes only on DB reload
     },
     "annotation_counts_subset": {
         "sql": """
@@ -158,10 +186,18 @@ QUERIES = {
                 COUNT(*) AS annotation_count,
                 COUNT(DISTINCT compound_id) AS n_compounds,
                 COUNT(DISTINCT genbank_region_id) AS n_genbank_regions
-            FROM annotation
-            WHERE
-                compound_id = ANY(%(compound_ids)s::bigint[])
-                OR genbank_region_id = ANY(%(genbank_region_ids)s::bigint[])
+            FROM (
+                -- One index scan per branch instead of a single OR filter;
+                -- the second branch skips rows already matched by the first
+                SELECT scheme, key, value, compound_id, genbank_region_id
+                FROM annotation
+                WHERE compound_id = ANY(%(compound_ids)s::bigint[])
+                UNION ALL
+                SELECT scheme, key, value, compound_id, genbank_region_id
+                FROM annotation
+                WHERE genbank_region_id = ANY(%(genbank_region_ids)s::bigint[])
+                AND (compound_id = ANY(%(compound_ids)s::bigint[])) IS NOT TRUE
+            ) AS a
             GROUP BY scheme, key, value
             ORDER BY {order_col} {order_dir}
         """,
@@ -172,8 +208,8 @@ QUERIES = {
         "default_order_col": "annotation_count",
         "default_order_dir": "DESC",
         "required": {
-            "compound_ids": list,
-            "genbank_region_ids": list,
+            "compound_ids": (list, int, MAX_ARRAY_LEN),
+            "genbank_region_ids": (list, int, MAX_ARRAY_LEN),
         },
         "optional": {},
     },
@@ -192,7 +228,7 @@ QUERIES = {
         "allowed_order_cols": set(),
         "default_order_col": "",
         "default_order_dir": "ASC",
-        "required": { "rf_ids": list },
+        "required": { "rf_ids": (list, int, MAX_ARRAY_LEN) },
         "optional": {},
     },
     "target_counts": {
@@ -206,5 +242,6 @@ QUERIES = {
         "default_order_dir": "ASC",
         "required": {},
         "optional": {},
+        "cache_ttl": 300,  # seconds; background universe, changes only on DB reload
     },
 }
\ No newline at end of file
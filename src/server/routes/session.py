@@ -1,7 +1,9 @@
 """Module for defining session endpoints."""
 
 import time
+from typing import Annotated, Any
 
+import msgspec
 from flask import Blueprint, request, jsonify
 
 from routes.session_store import (
@@ -11,6 +13,7 @@ from routes.session_store import (
     load_session_with_items,
     merge_session_from_client,
     count_sessions,
+    session_exists,
 )
 
 
@@ -20,6 +23,22 @@ blp_get_session = Blueprint("get_session", __name__)
 blp_save_session = Blueprint("save_session", __name__)
 
 
+NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class SessionRequest(msgspec.Struct):
+    """Request body of `/api/createSession` and `/api/saveSession`."""
+
+    # Stored as sent by the client, so kept as a plain dict
+    session: dict[str, Any]
+
+
+class SessionIdRequest(msgspec.Struct):
+    """Request body of `/api/deleteSession` and `/api/getSession`."""
+
+    sessionId: NonEmptyStr
+
+
 @blp_create_session.post("/api/createSession")
 def create_session() -> tuple[dict[str, str], int]:
     """
@@ -27,10 +46,9 @@ def create_session() -> tuple[dict[str, str], int]:
     
     :return: a tuple containing a dictionary with the session ID and an HTTP status code.
     """
-    payload = request.get_json(force=True) or {}
-    new_session = payload.get("session")
-
-    if not isinstance(new_session, dict):
+    try:
+        new_session = msgspec.json.decode(request.get_data(), type=SessionRequest).session
+    except msgspec.MsgspecError:
         return {"error": "Missing or invalid session"}, 400
     
     session_id = new_session.get("sessionId")
@@ -58,15 +76,13 @@ def delete_session() -> tuple[dict[str, str], int]:
     
     :return: a tuple containing a dictionary with the session ID and an HTTP status code.
     """
-    payload = request.get_json(force=True) or {}
-    session_id = payload.get("sessionId")
-
-    if not isinstance(session_id, str) or not session_id:
+    try:
+        session_id = msgspec.json.decode(request.get_data(), type=SessionIdRequest).sessionId
+    except msgspec.MsgspecError:
         return {"error": "Missing or invalid sessionId"}, 400
 
     # Check existence
-    sess = load_session_with_items(session_id)
-    if sess is None:
+    if not session_exists(session_id):
         return {"error": "Session not found"}, 404
 
     redis_delete_session(session_id)
@@ -81,10 +97,9 @@ def get_session() -> tuple[dict[str, str], int]:
     
     :return: a tuple containing a dictionary with the session data and an HTTP status code.
     """
-    payload = request.get_json(force=True) or {}
-    session_id = payload.get("sessionId")
-
-    if not isinstance(session_id, str) or not session_id:
+    try:
+        session_id = msgspec.json.decode(request.get_data(), type=SessionIdRequest).sessionId
+    except msgspec.MsgspecError:
         return {"error": "Missing or invalid sessionId"}, 400
 
     full = load_session_with_items(session_id)
@@ -115,10 +130,9 @@ def save_session() -> tuple[dict[str, str], int]:
     
     :return: a tuple containing a dictionary with the session ID and an HTTP status code.
     """
-    payload = request.get_json(force=True) or {}
-    new_session = payload.get("session")
-
-    if not isinstance(new_session, dict):
+    try:
+        new_session = msgspec.json.decode(request.get_data(), type=SessionRequest).session
+    except msgspec.MsgspecError:
         return {"error": "Missing or invalid session"}, 400
     
     try:
@@ -1,31 +1,53 @@
 """Module for managing session storage using Redis."""
 
-import json
 import os
 import time
-from typing import Any, Callable
+from functools import lru_cache
+from typing import Any
 
+import orjson
 import redis 
 
 MAX_SESSIONS = 1000
 JOB_TIMEOUT_SECONDS = int(os.getenv("JOB_TIMEOUT_SECONDS", "10"))
+# Queued jobs wait for a free worker, so they get a much longer timeout; it
+# only catches jobs that were lost, e.g. when the web process restarted
+JOB_QUEUE_TIMEOUT_SECONDS = int(os.getenv("JOB_QUEUE_TIMEOUT_SECONDS", "3600"))
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+COMPOUND_CACHE_TTL_SECONDS = int(os.getenv("COMPOUND_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
 
 APP_START_KEY = "app:start_epoch"
+SESSION_INDEX_KEY = "app:session_index"  # sorted set of session IDs scored by expiry epoch
+PENDING_INDEX_KEY = "app:pending_items"  # sorted set of queued/processing items scored by updatedAt (ms)
+PENDING_STATUSES = ("processing", "queued")
+PENDING_INDEX_SEEDED_KEY = "app:pending_items_seeded"  # set once the pending index was seeded from existing items
 SESSION_PREFIX = "session:"
-ITEM_PREFIX = "session_item:"  # key pattern: session_item:{sessionId}:{itemId}
+ITEMS_PREFIX = "session_items_data:"  # hash per session: session_items_data:{sessionId}, field = itemId
+# Items were stored under one key each before they moved to the per-session
+# hash; such keys are moved into the hash when first read (see `_load_item_blobs`)
+# and the fallback can go once sessions from before the move have expired
+LEGACY_ITEM_PREFIX = "session_item:"  # key pattern: session_item:{sessionId}:{itemId}
+COMPOUND_CACHE_PREFIX = "compound_cache:"  # key pattern: compound_cache:{pipeline version}:{smiles digest}
 
 
+@lru_cache(maxsize=1)
 def _get_redis() -> "redis.Redis":
     """
-    Get a Redis client instance.
+    Get the Redis client instance, sharing one connection pool per process.
 
     :return: Redis client instance
     """
-    # Return str isntead of byes (decode_responses=True)
-    return redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    # Return raw bytes (decode_responses=False); orjson parses bytes directly
+    return redis.Redis.from_url(
+        REDIS_URL,
+        decode_responses=False,
+        # Keep pooled connections alive across idle periods between requests
+        socket_keepalive=True,
+        health_check_interval=30,
+        retry_on_timeout=True,
+    )
 
 
 redis_client = _get_redis()
@@ -53,44 +75,94 @@ def get_or_init_app_start_epoch() -> int:
         return now
     
 
+def _seed_pending_index() -> int:
+    """
+    Add the pending items of all existing sessions to the pending index.
+
+    Items only enter the index when they are written, so items that were
+    already pending before the index was introduced would never be timed out.
+    This runs one full scan of the sessions, after which it is marked as done.
+    Seeding is idempotent, so concurrent runs are harmless.
+
+    :return: the number of pending items found
+    """
+    count = 0
+
+    # SESSION_PREFIX already includes "session:"
+    pattern = SESSION_PREFIX + "*"
+    for key in redis_client.scan_iter(match=pattern, count=1000):
+        session_id = key[len(SESSION_PREFIX):].decode()
+        meta = load_session_meta(session_id)
+        if meta is None:
+            continue  # expired in the meantime
+
+        item_ids = meta.get("items", []) or []
+        if not isinstance(item_ids, list):
+            continue
+        item_ids = [item_id for item_id in item_ids if isinstance(item_id, str) and item_id]
+
+        pending: dict[bytes, int] = {}
+        for item_id, data in zip(item_ids, _load_item_blobs(session_id, item_ids)):
+            if data is None:
+                continue
+            try:
+                item = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                continue
+            if isinstance(item, dict) and item.get("status") in PENDING_STATUSES:
+                pending[_pending_member(session_id, item_id)] = _updated_at_ms(item)
+
+        if pending:
+            redis_client.zadd(PENDING_INDEX_KEY, pending)
+            count += len(pending)
+
+    redis_client.set(PENDING_INDEX_SEEDED_KEY, "1")
+    return count
+
+
 def mark_stale_processing_items() -> int:
     """
     Mark items that have been in 'processing' status for too long as 'error'.
 
+    Items still in 'queued' status have not been picked up by a worker yet,
+    so they are only timed out after the much longer queue timeout.
+
+    Only items in the pending index whose `updatedAt` is older than the job
+    timeout are loaded, instead of scanning every item. The index is seeded
+    from existing sessions on the first run (see `_seed_pending_index`).
+
     :return: the number of items updated
     """
+    if not redis_client.exists(PENDING_INDEX_SEEDED_KEY):
+        _seed_pending_index()
+
     now_ms = int(time.time() * 1000)
     max_age_ms = JOB_TIMEOUT_SECONDS * 1000
+    max_queued_age_ms = max(JOB_QUEUE_TIMEOUT_SECONDS, JOB_TIMEOUT_SECONDS) * 1000
     updated_count = 0
 
-    pattern = ITEM_PREFIX + "*"
-    for key in redis_client.scan_iter(match=pattern):
-        raw = redis_client.get(key)
-        if raw is None:
-            continue
-        
-        try:
-            item = json.loads(raw)
-        except json.JSONDecodeError:
-            continue
+    members = redis_client.zrangebyscore(PENDING_INDEX_KEY, "-inf", f"({now_ms - max_age_ms}")
+    for member in members:
+        session_id, item_id = orjson.loads(member)
+        item = load_item(session_id, item_id)
 
-        if item.get("status") not in ("processing", "queued"):
+        # Item or session was deleted, or it moved on without updating the index
+        if item is None or item.get("status") not in PENDING_STATUSES:
+            redis_client.zrem(PENDING_INDEX_KEY, member)
             continue
 
-        updated_at = item.get("updatedAt", 0)
-        try:
-            updated_at = int(updated_at)
-        except (TypeError, ValueError):
-            updated_at = 0
+        # Re-check, as the item may have been updated since the range query
+        queued = item.get("status") == "queued"
+        if now_ms - _updated_at_ms(item) <= (max_queued_age_ms if queued else max_age_ms):
+            continue
 
-        age_ms = now_ms - updated_at
-        if age_ms > max_age_ms:
-            item["status"] = "error"
-            item["errorMessage"] = "Processing timed out"
-            item["updatedAt"] = now_ms
+        item["status"] = "error"
+        item["errorMessage"] = "Job was never started" if queued else "Processing timed out"
+        item["updatedAt"] = now_ms
 
-            redis_client.set(key, json.dumps(item), ex=SESSION_TTL_SECONDS)
-            updated_count += 1
+        # Leaves the pending index, as the status is no longer pending
+        _put_item_blob(session_id, item)
+        updated_count += 1
 
     return updated_count
 
@@ -105,33 +177,130 @@ def _session_key(session_id: str) -> str:
     return f"{SESSION_PREFIX}{session_id}"
 
 
-def _item_key(session_id: str, item_id: str) -> str:
+def _items_key(session_id: str) -> str:
+    """
+    Generate the Redis key of the hash holding a session's items.
+
+    :param session_id: the session ID
+    :return: the Redis key for the session items
+    """
+    return f"{ITEMS_PREFIX}{session_id}"
+
+
+def _legacy_item_key(session_id: str, item_id: str) -> str:
     """
-    Generate a Redis key for a session item.
+    Generate the legacy per-item Redis key for a session item.
 
     :param session_id: the session ID
     :param item_id: the item ID
-    :return: the Redis key for the session item
+    :return: the legacy Redis key for the item
     """
-    return f"{ITEM_PREFIX}{session_id}:{item_id}"
+    return f"{LEGACY_ITEM_PREFIX}{session_id}:{item_id}"
 
 
-def count_sessions() -> int:
+def _load_item_blobs(session_id: str, item_ids: list[str]) -> list[bytes | None]:
     """
-    Count the number of sessions stored in Redis.
+    Fetch item blobs from a session's items hash, falling back to legacy keys.
 
-    :return: the number of sessions
+    Items only found under a legacy per-item key are moved into the hash (and
+    the pending index, if pending), so every legacy key is read at most once.
+    HSETNX keeps a concurrent write to the hash from being overwritten.
+
+    :param session_id: the session ID
+    :param item_ids: the item IDs to fetch
+    :return: per item ID, the item blob, or None if not found
     """
+    if not item_ids:
+        return []
+
+    blobs = redis_client.hmget(_items_key(session_id), item_ids)
+    missing = [i for i, data in enumerate(blobs) if data is None]
+    if not missing:
+        return blobs
+
+    legacy_keys = [_legacy_item_key(session_id, item_ids[i]) for i in missing]
+    legacy_blobs = redis_client.mget(legacy_keys)
+    if not any(data is not None for data in legacy_blobs):
+        return blobs
+
+    pipe = redis_client.pipeline(transaction=False)
+    for i, legacy_key, data in zip(missing, legacy_keys, legacy_blobs):
+        if data is None:
+            continue
+        try:
+            item = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            continue
+
+        pipe.hsetnx(_items_key(session_id), item_ids[i], data)
+        if isinstance(item, dict) and item.get("status") in PENDING_STATUSES:
+            pipe.zadd(PENDING_INDEX_KEY, {_pending_member(session_id, item_ids[i]): _updated_at_ms(item)})
+        pipe.unlink(legacy_key)
+        blobs[i] = data
+    pipe.expire(_items_key(session_id), SESSION_TTL_SECONDS)
+    pipe.execute()
+
+    return blobs
+
+
+def _touch_session_index(session_id: str, client: Any = None) -> None:
+    """
+    Record a session in the session index with the expiry of its meta key.
+
+    :param session_id: the session ID
+    :param client: the Redis client or pipeline to queue the command on
+    """
+    if client is None:
+        client = redis_client
+    client.zadd(SESSION_INDEX_KEY, {session_id: time.time() + SESSION_TTL_SECONDS})
+
+
+def _backfill_session_index() -> int:
+    """
+    Rebuild the session index from the session meta keys with a full SCAN.
+
+    Only needed when the index is empty while sessions may exist, e.g. for
+    sessions created before the index was introduced.
+
+    :return: the number of sessions found
+    """
+    now = time.time()
     count = 0
 
     # SESSION_PREFIX already includes "session:"
     pattern = SESSION_PREFIX + "*"
-    for _ in redis_client.scan_iter(match=pattern):
+    for key in redis_client.scan_iter(match=pattern, count=1000):
+        ttl = redis_client.ttl(key)
+        if ttl == -2:
+            continue  # expired in the meantime
+        session_id = key[len(SESSION_PREFIX):].decode()
+        expiry = now + (ttl if ttl >= 0 else SESSION_TTL_SECONDS)
+        redis_client.zadd(SESSION_INDEX_KEY, {session_id: expiry})
         count += 1
 
     return count
 
 
+def count_sessions() -> int:
+    """
+    Count the number of sessions stored in Redis.
+
+    Sessions are counted from the session index, after dropping entries whose
+    meta key has expired, so no keyspace scan is needed.
+
+    :return: the number of sessions
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zremrangebyscore(SESSION_INDEX_KEY, "-inf", time.time())
+    pipe.zcard(SESSION_INDEX_KEY)
+    _, count = pipe.execute()
+
+    if count == 0:
+        return _backfill_session_index()
+
+    return count
+
+
 def create_session(session: dict[str, Any]) -> None:
     """
     Create a new session in Redis, storing items separately.
@@ -149,26 +318,39 @@ def create_session(session: dict[str, Any]) -> None:
 
     item_ids: list[str] = []
 
+    # Queue all writes and send them in one round trip
+    pipe = redis_client.pipeline(transaction=False)
+
     # Store each item separately
     for item in items:
         item_id = item.get("id")
         if not item_id:
             continue
         item_ids.append(item_id)
-        redis_client.set(
-            _item_key(session_id, item_id),
-            json.dumps(item),
-            ex=SESSION_TTL_SECONDS,
-        )
+        _put_item_blob(session_id, item, pipe)
+    if item_ids:
+        pipe.expire(_items_key(session_id), SESSION_TTL_SECONDS)
 
     # Store session metadata; we do NOT embed full items here
     meta = session.copy()
     meta["items"] = item_ids
-    redis_client.set(
+    pipe.set(
         _session_key(session_id),
-        json.dumps(meta),
+        orjson.dumps(meta),
         ex=SESSION_TTL_SECONDS,
     )
+    _touch_session_index(session_id, pipe)
+    pipe.execute()
+
+
+def session_exists(session_id: str) -> bool:
+    """
+    Check whether a session exists in Redis.
+
+    :param session_id: the session ID
+    :return: True if the session exists, False otherwise
+    """
+    return bool(redis_client.exists(_session_key(session_id)))
 
 
 def load_session_meta(session_id: str) -> dict[str, Any] | None:
@@ -182,7 +364,7 @@ def load_session_meta(session_id: str) -> dict[str, Any] | None:
     if data is None:
         return None
 
-    return json.loads(data)
+    return orjson.loads(data)
 
 
 def load_session_with_items(session_id: str) -> dict[str, Any] | None:
@@ -200,16 +382,17 @@ def load_session_with_items(session_id: str) -> dict[str, Any] | None:
     if not isinstance(item_ids, list):
         item_ids = []
 
+    # Fetch all item blobs in one round trip
+    fields = [item_id for item_id in item_ids if item_id]
+    blobs = _load_item_blobs(session_id, fields)
+
     items: list[dict] = []
-    for item_id in item_ids:
-        if not item_id:
-            continue
-        data = redis_client.get(_item_key(session_id, item_id))
+    for data in blobs:
         if data is None:
             continue
         try:
-            items.append(json.loads(data))
-        except json.JSONDecodeError:
+            items.append(orjson.loads(data))
+        except orjson.JSONDecodeError:
             continue
 
     # Return full session
@@ -232,12 +415,18 @@ def delete_session(session_id: str) -> None:
     if not isinstance(item_ids, list):
         item_ids = []
 
-    # Delete each item
-    for item_id in item_ids:
-        redis_client.delete(_item_key(session_id, item_id))
-
-    # Delete session meta
-    redis_client.delete(_session_key(session_id))
+    # Delete items and session meta in one round trip; UNLINK frees the
+    # (possibly large) items hash in the background
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.unlink(
+        _items_key(session_id),
+        _session_key(session_id),
+        *(_legacy_item_key(session_id, item_id) for item_id in item_ids),
+    )
+    pipe.zrem(SESSION_INDEX_KEY, session_id)
+    if item_ids:
+        pipe.zrem(PENDING_INDEX_KEY, *(_pending_member(session_id, item_id) for item_id in item_ids))
+    pipe.execute()
 
 
 def load_item(session_id: str, item_id: str) -> dict[str, Any] | None:
@@ -248,11 +437,62 @@ def load_item(session_id: str, item_id: str) -> dict[str, Any] | None:
     :param item_id: the item ID
     :return: the item data, or None if not found
     """
-    data = redis_client.get(_item_key(session_id, item_id))
+    data = _load_item_blobs(session_id, [item_id])[0]
     if data is None:
         return None
 
-    return json.loads(data)
+    return orjson.loads(data)
+
+
+def _pending_member(session_id: str, item_id: str) -> bytes:
+    """
+    Generate the pending index member for a session item.
+
+    :param session_id: the session ID
+    :param item_id: the item ID
+    :return: the sorted set member
+    """
+    return orjson.dumps([session_id, item_id])
+
+
+def _updated_at_ms(item: dict[str, Any]) -> int:
+    """
+    Get the `updatedAt` timestamp of an item, treating invalid values as 0.
+
+    :param item: the item data
+    :return: the timestamp in milliseconds
+    """
+    try:
+        return int(item.get("updatedAt", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _put_item_blob(session_id: str, item: dict[str, Any], client: Any = None) -> None:
+    """
+    Write an item blob without touching the session's item list.
+
+    Also adds the item to, or removes it from, the pending index depending on
+    its status. When queued on a pipeline, the caller is responsible for
+    refreshing the TTL of the items hash once after all writes.
+
+    :param session_id: the session ID
+    :param item: the item data to save; must have an 'id'
+    :param client: the Redis pipeline to queue the commands on, or None to
+        write immediately and refresh the TTL of the items hash
+    """
+    pipe = client if client is not None else redis_client.pipeline(transaction=False)
+
+    pipe.hset(_items_key(session_id), item["id"], orjson.dumps(item))
+    member = _pending_member(session_id, item["id"])
+    if item.get("status") in PENDING_STATUSES:
+        pipe.zadd(PENDING_INDEX_KEY, {member: _updated_at_ms(item)})
+    else:
+        pipe.zrem(PENDING_INDEX_KEY, member)
+
+    if client is None:
+        pipe.expire(_items_key(session_id), SESSION_TTL_SECONDS)
+        pipe.execute()
 
 
 def save_item(session_id: str, item: dict[str, Any]) -> None:
@@ -277,46 +517,61 @@ def save_item(session_id: str, item: dict[str, Any]) -> None:
         meta["items"] = item_ids
         redis_client.set(
             _session_key(session_id),
-            json.dumps(meta),
+            orjson.dumps(meta),
             ex=SESSION_TTL_SECONDS,
         )
+        _touch_session_index(session_id)
 
     # Save item blob
-    redis_client.set(
-        _item_key(session_id, item_id),
-        json.dumps(item),
-        ex=SESSION_TTL_SECONDS,
-    )
+    _put_item_blob(session_id, item)
+
+
+def patch_loaded_item(session_id: str, item: dict[str, Any], patch: dict[str, Any]) -> None:
+    """
+    Apply a patch to an item that was just loaded from the session and save it.
+
+    Unlike `update_item`, the item is not re-read and the session's item list
+    is not re-checked, as the caller already loaded it with `load_item`.
+
+    :param session_id: the session ID
+    :param item: the loaded item data, updated in place
+    :param patch: the fields to set on the item
+    """
+    item.update(patch)
+    _put_item_blob(session_id, item)
 
 
-def update_item(session_id: str, item_id: str, mutator: Callable[[dict[str, Any]], None]) -> bool:
+def update_item(session_id: str, item_id: str, patch: dict[str, Any]) -> bool:
     """
-    Update a specific item in a session using a mutator function.
+    Update a specific item in a session by applying a patch of fields.
+
+    The item already exists, so it is in the session's item list; only the
+    item blob is rewritten.
 
     :param session_id: the session ID
     :param item_id: the item ID
-    :param mutator: a function that takes the item dict and modifies it in place
+    :param patch: the fields to set on the item
     :return: True if the item was found and updated, False otherwise
     """
     item = load_item(session_id, item_id)
     if item is None:
         return False
 
-    mutator(item)
+    item.update(patch)
 
-    save_item(session_id, item)
+    _put_item_blob(session_id, item)
     return True
     
 
 # Fields that are owned by the server and should not be overwritten by client data
-SERVER_OWNED_FIELDS = {
+SERVER_OWNED_FIELDS = frozenset({
     "status",
     "errorMessage",
     "fingerprints",
     "fingerprint512",
     "coverage",
     "updatedAt",
-}
+})
 
 
 def merge_session_from_client(new_session: dict[str, Any]) -> None:
@@ -330,67 +585,116 @@ def merge_session_from_client(new_session: dict[str, Any]) -> None:
     if not isinstance(session_id, str) or not session_id:
         raise ValueError("Session is missing a valid 'sessionId'")
     
-    # Load existing session meta + items
-    old_full = load_session_with_items(session_id)
-    if old_full is None:
+    # Load existing session meta
+    meta = load_session_meta(session_id)
+    if meta is None:
         raise ValueError(f"Session '{session_id}' does not exist")
-    
-    old_items_list = old_full.get("items", []) or []
+
+    old_item_ids = meta.get("items", []) or []
+    if not isinstance(old_item_ids, list):
+        old_item_ids = []
+    old_ids = {item_id for item_id in old_item_ids if item_id}
     new_items_list = new_session.get("items", []) or []
 
-    old_ids = {it.get("id") for it in old_items_list if it.get("id")}
-    old_by_id: dict[str, dict] = {
-        it.get("id"): it
-        for it in old_items_list
-        if it.get("id")
-    }
+    # Only items kept by the client need their stored version for the merge;
+    # items removed by the client are deleted without being read
+    kept_ids = [
+        it.get("id") for it in new_items_list
+        if isinstance(it.get("id"), str) and it.get("id") in old_ids
+    ]
+    blobs = _load_item_blobs(session_id, kept_ids)
+    old_by_id: dict[str, dict] = {}
+    for item_id, data in zip(kept_ids, blobs):
+        if data is None:
+            continue
+        try:
+            old_by_id[item_id] = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            continue
 
-    merged_items: list[dict] = []
+    changed_items: list[dict] = []
     new_item_ids: list[str] = []
 
     for new_item in new_items_list:
         item_id = new_item.get("id")
         if not item_id:
             continue
+        if not isinstance(item_id, str):
+            raise ValueError("Item is missing a valid 'id'")
         
         old_item = old_by_id.get(item_id)
         
         if old_item is None:
             # New item: accept as-is (client owns everything initially)
-            merged_items.append(new_item)
+            changed_items.append(new_item)
             new_item_ids.append(item_id)
         else:
-            # Existing item: merge client fields into old item, presevering server-owned fields
-            for key, value in new_item.items():
-                if key in SERVER_OWNED_FIELDS:
-                    continue
-                old_item[key] = value
-            merged_items.append(old_item)
+            # Existing item: merge client fields into old item, presevering server-owned fields;
+            # only items whose client fields changed are written back
+            client_fields = {k: v for k, v in new_item.items() if k not in SERVER_OWNED_FIELDS}
+            if any(k not in old_item or old_item[k] != v for k, v in client_fields.items()):
+                old_item.update(client_fields)
+                changed_items.append(old_item)
             new_item_ids.append(item_id)
 
+    # Queue all writes and send them in one round trip; items are written
+    # directly rather than through `save_item`, as the meta is written once below
+    pipe = redis_client.pipeline(transaction=False)
+
     # Delete items that were removed by the client
     new_ids_set = set(new_item_ids)
     deleted_ids = old_ids - new_ids_set
-    for item_id in deleted_ids:
-        redis_client.delete(_item_key(session_id, item_id))
+    if deleted_ids:
+        pipe.hdel(_items_key(session_id), *deleted_ids)
+        pipe.unlink(*(_legacy_item_key(session_id, item_id) for item_id in deleted_ids))
+        pipe.zrem(PENDING_INDEX_KEY, *(_pending_member(session_id, item_id) for item_id in deleted_ids))
 
-    # Save merged items
-    for item in merged_items:
-        save_item(session_id, item)
+    # Save new and changed items
+    for item in changed_items:
+        _put_item_blob(session_id, item, pipe)
+    pipe.expire(_items_key(session_id), SESSION_TTL_SECONDS)
 
     # Update session meta, preserving non-item fields
-    old_full["items"] = new_item_ids
     # Copy other top-level fields from client session if needed
     for key, value in new_session.items():
         if key == "items":
             continue
-        old_full[key] = value
+        meta[key] = value
 
     # Save session meta (without full items array)
-    meta = old_full.copy()
     meta["items"] = new_item_ids
-    redis_client.set(
+    pipe.set(
         _session_key(session_id),
-        json.dumps(meta),
+        orjson.dumps(meta),
         ex=SESSION_TTL_SECONDS,
     )
+    _touch_session_index(session_id, pipe)
+    pipe.execute()
+
+
+def load_cached_compound(digest: str) -> Any | None:
+    """
+    Load a cached compound result shared across sessions.
+
+    :param digest: the digest identifying the compound and the pipeline version
+    :return: the cached result, or None if not cached
+    """
+    data = redis_client.get(f"{COMPOUND_CACHE_PREFIX}{digest}")
+    if data is None:
+        return None
+
+    return orjson.loads(data)
+
+
+def save_cached_compound(digest: str, result: Any) -> None:
+    """
+    Cache a compound result so it is shared across sessions and restarts.
+
+    :param digest: the digest identifying the compound and the pipeline version
+    :param result: the JSON-serializable result to cache
+    """
+    redis_client.set(
+        f"{COMPOUND_CACHE_PREFIX}{digest}",
+        orjson.dumps(result),
+        ex=COMPOUND_CACHE_TTL_SECONDS,
+    )
@@ -1,11 +1,20 @@
 """Module for handling view requests."""
 
-import math
+import hashlib
+import multiprocessing
+import os
 import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
 
 import numpy as np
 import umap
+from pynndescent import NNDescent
+from scipy.special import gammaln
 from sklearn.decomposition import PCA
 from flask import Blueprint, current_app, request, jsonify
 
@@ -14,8 +23,8 @@ from versalign.msa import calc_msa
 from versalign.printing import format_alignment
 from versalign.scoring import create_substituion_matrix_dynamically
 
-from routes.helpers import hex_to_bits, get_unique_identifier
-from routes.query import execute_named_query
+from routes.helpers import hex_to_packed, get_unique_identifier
+from routes.query import execute_named_query, iter_named_query
 
 
 blp_get_embedding_space = Blueprint("get_embedding_space", __name__)
@@ -23,63 +32,352 @@ blp_enrich = Blueprint("enrich", __name__)
 blp_run_msa = Blueprint("run_msa", __name__)
 
 
-def _log_hypergeom_probability(a: int, b: int, c: int, d: int) -> float:
+def _log_factorials(n: int) -> np.ndarray:
     """
-    Compute log probability of a 2x2 table under the hypergeometric model.
-    
-    :param a: count in cell (1,1)
-    :param b: count in cell (1,2)
-    :param c: count in cell (2,1)
-    :param d: count in cell (2,2)
-    :return: log probability
-    """
-    total = a + b + c + d
-    return (
-        math.lgamma(a + b + 1)
-        - math.lgamma(a + 1)
-        - math.lgamma(b + 1)
-        + math.lgamma(c + d + 1)
-        - math.lgamma(c + 1)
-        - math.lgamma(d + 1)
-        - math.lgamma(total + 1)
-        + math.lgamma(a + c + 1)
-        + math.lgamma(b + d + 1)
-    )
+    Tabulate log(k!) for k = 0..n.
+
+    :param n: the largest k
+    :return: array of length n + 1 with log(k!) at index k
+    """
+    return gammaln(np.arange(1, n + 2, dtype=np.float64))
 
 
-def _fisher_exact_two_sided(a: int, b: int, c: int, d: int) -> float:
+def _fisher_exact_two_sided_batch(
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    d: np.ndarray,
+    log_fact: np.ndarray,
+) -> np.ndarray:
     """
-    Return two-sided Fisher's exact test p-value for a 2x2 table.
-    
-    :param a: count in cell (1,1)
-    :param b: count in cell (1,2)
-    :param c: count in cell (2,1)
-    :param d: count in cell (2,2)
-    :return: two-sided p-value
+    Return two-sided Fisher's exact test p-values for a batch of 2x2 tables.
+
+    The supports of all tables (every table with the same margins, indexed by
+    its (1,1) cell) are laid out in one flat array, so all tests are evaluated
+    with a fixed number of NumPy calls.
+
+    :param a: counts in cell (1,1), shape (N,)
+    :param b: counts in cell (1,2), shape (N,)
+    :param c: counts in cell (2,1), shape (N,)
+    :param d: counts in cell (2,2), shape (N,)
+    :param log_fact: log(k!) table covering at least k = max(a + b + c + d) (see `_log_factorials`)
+    :return: two-sided p-values, shape (N,)
+    :raises ValueError: if any count is negative
     """
-    if min(a, b, c, d) < 0:
+    a, b, c, d = (np.asarray(v, dtype=np.int64) for v in (a, b, c, d))
+    if min(a.min(), b.min(), c.min(), d.min()) < 0:
         raise ValueError("Fisher's exact test counts must be non-negative")
 
     r1 = a + b
     r2 = c + d
     c1 = a + c
+    c2 = b + d
+    total = r1 + r2
+
+    # Support of each table: x in [lo, hi], laid out back to back
+    lo = np.maximum(0, c1 - r2)
+    lengths = np.minimum(r1, c1) - lo + 1
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    row = np.repeat(np.arange(a.shape[0]), lengths)
+    x = np.arange(lengths.sum()) - starts[row] + lo[row]
+
+    log_margins = log_fact[r1] + log_fact[r2] + log_fact[c1] + log_fact[c2] - log_fact[total]
+    log_probs = log_margins[row] - (
+        log_fact[x] + log_fact[r1[row] - x] + log_fact[c1[row] - x] + log_fact[r2[row] - c1[row] + x]
+    )
+    obs_log_prob = log_margins - (log_fact[a] + log_fact[b] + log_fact[c] + log_fact[d])
+
+    # Sum the tables at most as likely as the observed one, per test
+    probs = np.where(log_probs <= obs_log_prob[row] + 1e-12, np.exp(log_probs), 0.0)
+    return np.minimum(np.add.reduceat(probs, starts), 1.0)
+
+
+# Background annotation lookup of the last seen `annotation_counts_full`
+# result; the query result is cached by identity, so the lookup is only rebuilt
+# when the query cache hands out a new result
+_BACKGROUND_LOOKUP: tuple[dict | None, dict[tuple, int]] = (None, {})
+_BACKGROUND_LOOKUP_LOCK = threading.Lock()
+
+
+def _background_lookup(ann_full: dict) -> dict[tuple, int]:
+    """
+    Map (scheme, key, value) to the number of background targets per annotation.
+
+    :param ann_full: result of the `annotation_counts_full` query
+    :return: dictionary keyed on (scheme, key, value)
+    """
+    global _BACKGROUND_LOOKUP
+    with _BACKGROUND_LOOKUP_LOCK:
+        source, lookup = _BACKGROUND_LOOKUP
+        if source is ann_full:
+            return lookup
+
+    lookup = {
+        (row.get("scheme"), row.get("key"), row.get("value")):
+            int(row.get("n_compounds", 0)) + int(row.get("n_genbank_regions", 0))
+        for row in ann_full.get("rows", [])
+    }
+    with _BACKGROUND_LOOKUP_LOCK:
+        _BACKGROUND_LOOKUP = (ann_full, lookup)
+
+    return lookup
+
+
+# From this many samples on UMAP builds an approximate kNN graph with
+# NN-descent; below it computes exact pairwise distances, which is cheaper
+PRECOMPUTED_KNN_MIN_SAMPLES = 4096
+
+# Number of set bits per byte value, for NumPy versions without `bitwise_count`
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def _popcount_rows(packed: np.ndarray) -> np.ndarray:
+    """
+    Count the set bits of bit-packed rows.
+
+    On NumPy 2 the bytes are counted with `np.bitwise_count`, which maps to the
+    CPU's popcount instruction; otherwise a byte lookup table is used. Rows can
+    have any width, e.g. after bits were removed with a mask.
+
+    :param packed: uint8 array of shape (..., n_bytes)
+    :return: array of shape (...) with the number of set bits per row
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(packed).sum(axis=-1, dtype=np.uint16)
+    return _POPCOUNT[packed].sum(axis=-1)
+
+
+def _bit_jaccard_knn(fps: np.ndarray, n_neighbors: int) -> tuple[np.ndarray, np.ndarray, NNDescent]:
+    """
+    Build the kNN graph of binary fingerprints on their bit-packed form.
+
+    NN-descent runs pynndescent's popcount kernel on bit-packed rows (one byte
+    per 8 bits, of any width) instead of UMAP's Jaccard kernel on unpacked bits. The neighbour distances are then
+    recomputed as plain Jaccard distances, so they match `metric="jaccard"`.
+
+    :param fps: bit matrix of shape (N, n_bits)
+    :param n_neighbors: the number of neighbours per sample, including itself
+    :return: a tuple with the neighbour indices and distances, both of shape
+        (N, n_neighbors), and the search index, as expected by UMAP's `precomputed_knn`
+    """
+    packed = np.packbits(fps.astype(bool), axis=1)
+    index = NNDescent(packed, metric="bit_jaccard", n_neighbors=n_neighbors, random_state=42)
+    indices, _ = index.neighbor_graph
+
+    rows = packed[:, None, :]
+    neighbors = packed[indices]
+    intersection = _popcount_rows(rows & neighbors)
+    union = _popcount_rows(rows | neighbors)
+    dists = np.zeros(indices.shape, dtype=np.float32)
+    np.divide(union - intersection, union, out=dists, where=union > 0)
+    return indices, dists, index
+
+
+def _fixed_layout(coords: list[list[float]]) -> np.ndarray:
+    """
+    Build a read-only (N, 2) coordinate array.
+
+    :param coords: list of [x, y] pairs
+    :return: read-only array of shape (N, 2)
+    """
+    arr = np.array(coords, dtype=np.float64)
+    arr.setflags(write=False)
+    return arr
+
+
+# Fixed layouts for very small N, where UMAP's spectral step is fragile: a
+# single point at the origin (jitter will be applied later so might not be
+# exactly at origin), otherwise points evenly spaced on the unit circle
+_SMALL_EMBEDDINGS = {
+    1: _fixed_layout([[0.0, 0.0]]),
+    2: _fixed_layout([[1.0, 0.0], [-1.0, 0.0]]),
+    3: _fixed_layout([[1.0, 0.0], [-0.5, 0.8660254037844386], [-0.5, -0.8660254037844386]]),
+}
+
+
+def _reduce_to_2d(fps: np.ndarray, method: str) -> np.ndarray:
+    """
+    Reduce fingerprints to 2D coordinates.
+
+    :param fps: bit matrix of shape (N, n_bits)
+    :param method: the reduction method, 'pca' or 'umap'
+    :return: array of shape (N, 2)
+    """
+    n_samples = fps.shape[0]
+    if n_samples in _SMALL_EMBEDDINGS:
+        return _SMALL_EMBEDDINGS[n_samples]
+
+    if method == "pca":
+        # PCA
+        pca = PCA(n_components=2, random_state=42)
+        return pca.fit_transform(fps)
+
+    # Default to UMAP
+    n_neighbors = min(15, n_samples - 1)
+    # Jaccard (Tanimoto) distance on the bits, the usual similarity
+    # for binary fingerprints and cheaper than cosine on floats
+    precomputed_knn = (None, None, None)
+    if n_samples >= PRECOMPUTED_KNN_MIN_SAMPLES:
+        precomputed_knn = _bit_jaccard_knn(fps, n_neighbors)
+    reducer = umap.UMAP(
+        n_components=2,
+        n_neighbors=n_neighbors,
+        random_state=42,
+        metric="jaccard",
+        precomputed_knn=precomputed_knn,
+    )
+    return reducer.fit_transform(fps.astype(bool))
+
+
+def _reduce_packed_to_2d(packed: np.ndarray, bits_to_keep: np.ndarray | None, method: str) -> np.ndarray:
+    """
+    Reduce packed fingerprints to 2D coordinates; runs in an embedding worker.
+
+    :param packed: packed fingerprints of shape (N, 64)
+    :param bits_to_keep: boolean mask over the 512 bits, or None to keep all
+    :param method: the reduction method, 'pca' or 'umap'
+    :return: array of shape (N, 2)
+    """
+    fps = np.unpackbits(packed, axis=1)
+    if bits_to_keep is not None:
+        fps = fps[:, bits_to_keep]
+    if method == "pca":
+        return _reduce_to_2d(fps, method)
+
+    # UMAP embeds identical fingerprints on top of each other anyway, so fit
+    # each distinct row once and fan the coordinates back out
+    rows = np.ascontiguousarray(np.packbits(fps, axis=1))
+    keys = rows.view(np.dtype((np.void, rows.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return _reduce_to_2d(fps[first], method)[inverse.ravel()]
+
+
+def _warm_up_embedding_worker() -> None:
+    """
+    Fit a tiny UMAP in a new embedding worker, so that numba compilation is
+    paid once per worker rather than by the first request.
+    """
+    rng = np.random.default_rng(42)
+    _reduce_to_2d(rng.integers(0, 2, size=(32, 512), dtype=np.uint8), "umap")
+
+
+# UMAP/PCA fits run in a small process pool, so that a long fit neither holds
+# the GIL of the web process nor blocks the other request threads; the packed
+# fingerprints (64 bytes per row) are cheap to send to a worker
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0")) or min(2, os.cpu_count() or 1)
+
+# The executor is created lazily on first use, so that it is not shared with
+# processes forked from a preloading gunicorn master
+_EMBEDDING_POOL: ProcessPoolExecutor | None = None
+_EMBEDDING_POOL_LOCK = threading.Lock()
+
+
+def _get_embedding_pool() -> ProcessPoolExecutor:
+    """
+    Get the process pool for embedding fits, creating it if needed.
+
+    :return: the process pool executor
+    """
+    global _EMBEDDING_POOL
+    if _EMBEDDING_POOL is None:
+        with _EMBEDDING_POOL_LOCK:
+            if _EMBEDDING_POOL is None:
+                _EMBEDDING_POOL = ProcessPoolExecutor(
+                    max_workers=EMBEDDING_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_up_embedding_worker,
+                )
+    return _EMBEDDING_POOL
+
+
+def _discard_embedding_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Drop a broken embedding pool, so that the next fit creates a fresh one.
+
+    :param pool: the broken process pool executor
+    """
+    global _EMBEDDING_POOL
+    with _EMBEDDING_POOL_LOCK:
+        # Another thread may have replaced it already
+        if _EMBEDDING_POOL is pool:
+            _EMBEDDING_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_embedding_job(*args: Any) -> np.ndarray:
+    """
+    Run `_reduce_packed_to_2d` in the embedding pool and wait for the result.
+
+    A worker that dies abruptly (e.g. killed for running out of memory) breaks
+    the whole executor, so a broken pool is replaced: once before submitting,
+    and after a fit that broke it. The fit that broke the pool is not retried.
+
+    :param args: the arguments to `_reduce_packed_to_2d`
+    :return: array of shape (N, 2)
+    :raises BrokenProcessPool: if the worker running the fit died
+    """
+    pool = _get_embedding_pool()
+    try:
+        future = pool.submit(_reduce_packed_to_2d, *args)
+    except BrokenProcessPool:
+        current_app.logger.warning("embedding process pool is broken; replacing it")
+        _discard_embedding_pool(pool)
+        pool = _get_embedding_pool()
+        future = pool.submit(_reduce_packed_to_2d, *args)
+
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard_embedding_pool(pool)
+        raise
+
+
+# Recently computed embeddings, keyed on a digest of the method and the input
+# fingerprints; reductions are seeded, so the same input gives the same output
+EMBEDDING_CACHE_MAX_SIZE = 32
+_EMBEDDING_CACHE: OrderedDict[bytes, np.ndarray] = OrderedDict()
+_EMBEDDING_CACHE_LOCK = threading.Lock()
+
+
+def _reduce_to_2d_cached(packed: np.ndarray, bits_to_keep: np.ndarray | None, method: str) -> np.ndarray:
+    """
+    Reduce packed fingerprints to 2D coordinates, reusing the result for identical input.
+
+    Re-opening the embedding view for an unchanged workspace then skips the
+    UMAP/PCA fit entirely. Other fits run in the embedding process pool.
 
-    min_a = max(0, c1 - r2)
-    max_a = min(r1, c1)
+    :param packed: packed fingerprints of shape (N, 64)
+    :param bits_to_keep: boolean mask over the 512 bits, or None to keep all
+    :param method: the reduction method, 'pca' or 'umap'
+    :return: array of shape (N, 2)
+    """
+    n_samples = packed.shape[0]
+    if n_samples in _SMALL_EMBEDDINGS:
+        return _SMALL_EMBEDDINGS[n_samples]
+
+    packed = np.ascontiguousarray(packed, dtype=np.uint8)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(method.encode())
+    h.update(np.asarray(packed.shape, dtype=np.int64).tobytes())
+    h.update(packed.tobytes())
+    if bits_to_keep is not None:
+        h.update(np.packbits(bits_to_keep).tobytes())
+    key = h.digest()
+
+    with _EMBEDDING_CACHE_LOCK:
+        reduced = _EMBEDDING_CACHE.get(key)
+        if reduced is not None:
+            _EMBEDDING_CACHE.move_to_end(key)
+            return reduced
+
+    reduced = _run_embedding_job(packed, bits_to_keep, method)
 
-    obs_log_prob = _log_hypergeom_probability(a, b, c, d)
-    p_sum = 0.0
-    for x in range(min_a, max_a + 1):
-        y = r1 - x
-        z = c1 - x
-        w = r2 - z
-        if y < 0 or z < 0 or w < 0:
-            continue
-        log_prob = _log_hypergeom_probability(x, y, z, w)
-        if log_prob <= obs_log_prob + 1e-12:
-            p_sum += math.exp(log_prob)
+    with _EMBEDDING_CACHE_LOCK:
+        _EMBEDDING_CACHE[key] = reduced
+        if len(_EMBEDDING_CACHE) > EMBEDDING_CACHE_MAX_SIZE:
+            _EMBEDDING_CACHE.popitem(last=False)
 
-    return min(p_sum, 1.0)
+    return reduced
 
 
 @blp_get_embedding_space.post("/api/getEmbeddingSpace")
@@ -101,83 +399,63 @@ def get_embedding_space() -> tuple[dict[str, str], int]:
         current_app.logger.warning("get_embedding_space: missing sessionId or items")
         return jsonify({"error": "Missing sessionId or items"}), 400
     
-    # Filter out any item that does not have required fields for item
-    required_fields_item = {"id", "kind", "fingerprints"}
-    items = [item for item in items if required_fields_item.issubset(item.keys())]
-
-    # Filter out any item that does not have required fields for fingerprint item
-    required_fields_fp = {"id", "fingerprint512", "score"}
-    for item in items:
-        item["fingerprints"] = [fp_item for fp_item in item["fingerprints"] if required_fields_fp.issubset(fp_item.keys())]
-    
     t0 = time.time()
 
-    # Gather all "kind" types; if both "compound" and "gene_cluster" are present, set reduce_fp to True
-    reduce_fp = False
-    kinds = set(item["kind"] for item in items)
-    if "compound" in kinds and "gene_cluster" in kinds:
-        reduce_fp = True
-
     try:
-        # Decode fingerprints
-        kinds, parent_ids, child_ids, fps = [], [], [], []
+        # Validate and decode fingerprints in one pass; items and fingerprint
+        # items that lack a required field are skipped
+        kinds, parent_ids, child_ids, fp_hexes = [], [], [], []
         for item in items:
-            for fp_item in item["fingerprints"]:
-                kinds.append(item["kind"])
-                parent_ids.append(item["id"])
-                child_ids.append(fp_item["id"])
-                fps.append(hex_to_bits(fp_item["fingerprint512"]))
+            try:
+                kind, parent_id, fp_items = item["kind"], item["id"], item["fingerprints"]
+            except KeyError:
+                continue
+            for fp_item in fp_items:
+                try:
+                    child_id, fp_hex, _ = fp_item["id"], fp_item["fingerprint512"], fp_item["score"]
+                except KeyError:
+                    continue
+                kinds.append(kind)
+                parent_ids.append(parent_id)
+                child_ids.append(child_id)
+                fp_hexes.append(fp_hex)
+
+        # If both "compound" and "gene_cluster" fingerprints are present, set reduce_fp to True
+        kind_set = set(kinds)
+        reduce_fp = "compound" in kind_set and "gene_cluster" in kind_set
 
         # Handle case with no fingerprints
-        if len(fps) == 0:
+        if len(fp_hexes) == 0:
             # Return empty points
             points = []
 
         else:
-            # Convert to numpy array
-            fps = np.array(fps)
+            # Decode all fingerprints at once; rows stay packed (64 bytes each)
+            # until they reach the embedding worker
+            packed = hex_to_packed(fp_hexes)
 
             # Reduce dimensionality if needed
+            bits_to_keep = None
             if reduce_fp:
-                # Remove every bit that is not set in "gene_cluster" fingerprints
-                gene_cluster_fps = fps[[i for i, kind in enumerate(kinds) if kind == "gene_cluster"]]
-                bits_to_keep = np.any(gene_cluster_fps, axis=0)
-                fps = fps[:, bits_to_keep]
+                # Remove every bit that is not set in "gene_cluster" fingerprints;
+                # the union is taken on the packed bytes (64 per row)
+                gene_cluster_rows = np.flatnonzero(np.array(kinds, dtype=object) == "gene_cluster")
+                bits_to_keep = np.unpackbits(np.bitwise_or.reduce(packed[gene_cluster_rows], axis=0)).astype(bool)
 
             # Reduce dimensionality using selected method
-            n_samples = fps.shape[0]
-            if n_samples == 1:
-                # Single point: put it at the origin (jitter will be applied later so might not be exactly at origin)
-                reduced = np.zeros((1, 2))
-            elif n_samples <= 3:
-                # UMAP's spectral step is fragile for very small N
-                # Put points on unit circle evenly spaced
-                angles = np.linspace(0, 2 * np.pi, n_samples, endpoint=False)
-                reduced = np.stack([np.cos(angles), np.sin(angles)], axis=1)
-            else:
-                if method == "pca":
-                    # PCA
-                    pca = PCA(n_components=2, random_state=42)
-                    reduced = pca.fit_transform(fps)
-                else:
-                    # Default to UMAP
-                    n_neighbors = min(15, n_samples - 1)
-                    reducer = umap.UMAP(
-                        n_components=2,
-                        n_neighbors=n_neighbors,
-                        random_state=42,
-                        metric="cosine"
-                    )
-                    reduced = reducer.fit_transform(fps)
+            reduced = _reduce_to_2d_cached(packed, bits_to_keep, method)
 
+            # Four decimals is plenty for plotting and keeps the JSON short;
+            # convert all coordinates to Python floats in one call
+            reduced = np.round(reduced, 4)
             points = [
                 {
                     "parent_id": parent_id,
                     "child_id": child_id,
                     "kind": kind,
-                    "x": float(reduced[i, 0]),
-                    "y": float(reduced[i, 1]),
-                } for i, (kind, parent_id, child_id) in enumerate(zip(kinds, parent_ids, child_ids))
+                    "x": x,
+                    "y": y,
+                } for kind, parent_id, child_id, (x, y) in zip(kinds, parent_ids, child_ids, reduced.tolist())
             ]
     except Exception as e:
         current_app.logger.error(f"get_embedding_space: error processing items: {e}")
@@ -212,15 +490,18 @@ def run_enrichment() -> tuple[dict[str, str], int]:
 
     t0 = time.time()
 
-    result = execute_named_query(
-        name="cross_modal_retrieval",
-        params={
-            "fingerprint512": fp_hex_string,
-            "querySettings": query_settings,
-        },
-        paging={},
-        order={},
-    )
+    try:
+        result = execute_named_query(
+            name="cross_modal_retrieval",
+            params={
+                "fingerprint512": fp_hex_string,
+                "querySettings": query_settings,
+            },
+            paging={},
+            order={},
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # If num_rows is equal to max_limit_in_group, we know there are more results
     # Throw error and ask user to up the score threshold
@@ -272,17 +553,6 @@ def run_enrichment() -> tuple[dict[str, str], int]:
         order={},
     )
 
-    # Get annotation counts for subset
-    ann_subset = execute_named_query(
-        name="annotation_counts_subset",
-        params={
-            "compound_ids": list(compound_ids),
-            "genbank_region_ids": list(genbank_region_ids),
-        },
-        paging={ "limit":  1_000_000_000 },  # use high limit otherwise default limit of 1000 applies
-        order={},
-    )
-
     # Total number of targets in universe (all compounds + all genbank regions)
     bg_counts = execute_named_query(
         name="target_counts",
@@ -295,84 +565,105 @@ def run_enrichment() -> tuple[dict[str, str], int]:
 
     # Do statistical enrichment analysis (Fisher's exact test)
     full_rows = ann_full.get("rows", [])
-    subset_rows = ann_subset.get("rows", [])
     enrichment_candidates: list[dict] = []
 
     if (
-        subset_rows
-        and full_rows
+        full_rows
         and subset_total_targets > 0
         and background_total_targets > subset_total_targets
     ):
-        def _ann_key(row: dict) -> tuple:
-            return (row.get("scheme"), row.get("key"), row.get("value"))
+        background_lookup = _background_lookup(ann_full)
 
-        full_lookup = {_ann_key(row): row for row in full_rows}
+        # Every table sums to the background total, so one table covers all tests
+        log_fact = _log_factorials(background_total_targets)
+        tables: list[tuple[int, int, int, int]] = []
     
-        for row in subset_rows:
-            key = _ann_key(row)
-            base_row = full_lookup.get(key)
-            if not base_row:
-                continue
+        # Get annotation counts for subset; rows are streamed from the database
+        # and turned into tables as they arrive. The ids come from the database,
+        # not the request, so the array length cap is lifted to fit them all
+        subset_rows = iter_named_query(
+            name="annotation_counts_subset",
+            params={
+                "compound_ids": list(compound_ids),
+                "genbank_region_ids": list(genbank_region_ids),
+            },
+            paging={ "limit":  1_000_000_000 },  # use high limit otherwise default limit of 1000 applies
+            order={},
+            max_array_len=max(len(compound_ids), len(genbank_region_ids)),
+        )
 
-            subset_with = int(row.get("n_compounds", 0)) + int(row.get("n_genbank_regions", 0))
-            if subset_with <= 0:
-                continue
+        try:
+            for row in subset_rows:
+                background_with = background_lookup.get((row.get("scheme"), row.get("key"), row.get("value")))
+                if background_with is None:
+                    continue
 
-            background_with = int(base_row.get("n_compounds", 0)) + int(base_row.get("n_genbank_regions", 0))
-            if background_with <= 0 or background_with < subset_with:
-                continue
-            
-            # 2x2 per target:
-            # a = subset tarets WITH this annotation
-            # b = subset targets WITHOUT this annotation
-            # c = background-only targets WITH this annotation
-            # d = background-only targets WITHOUT this annotation
-            a = subset_with
-            b = subset_total_targets - a
-
-            background_only_total = background_total_targets - subset_total_targets
-            c = background_with - a
-            d = background_only_total - c
-
-            if min(a, b, c, d) < 0:
-                continue
+                subset_with = int(row.get("n_compounds", 0)) + int(row.get("n_genbank_regions", 0))
+                if subset_with <= 0:
+                    continue
 
-            p_value = _fisher_exact_two_sided(a, b, c, d)
-    
-            enrichment_candidates.append({
-                "id": f"{row['scheme']}::{row['key']}::{row['value']}",
-                "schema": row["scheme"],
-                "key": row["key"],
-                "value": row["value"],
-                "subset_count": a,
-                "background_count": background_with,
-                "p_value": p_value,
-            })
+                if background_with <= 0 or background_with < subset_with:
+                    continue
+            
+                # 2x2 per target:
+                # a = subset tarets WITH this annotation
+                # b = subset targets WITHOUT this annotation
+                # c = background-only targets WITH this annotation
+                # d = background-only targets WITHOUT this annotation
+                a = subset_with
+                b = subset_total_targets - a
+
+                background_only_total = background_total_targets - subset_total_targets
+                c = background_with - a
+                d = background_only_total - c
+
+                if min(a, b, c, d) < 0:
+                    continue
+
+                tables.append((a, b, c, d))
+                enrichment_candidates.append({
+                    "id": f"{row['scheme']}::{row['key']}::{row['value']}",
+                    "schema": row["scheme"],
+                    "key": row["key"],
+                    "value": row["value"],
+                    "subset_count": a,
+                    "background_count": background_with,
+                })
+        except ValueError as e:
+            current_app.logger.warning(f"run_enrichment: invalid subset query: {e}")
+            return jsonify({"ok": False, "status": "error", "error": str(e)}), 400
+        except (TimeoutError, RuntimeError) as e:
+            current_app.logger.error(f"run_enrichment: subset query failed: {e}")
+            return jsonify({"ok": False, "status": "error", "error": str(e)}), 500
+
+        # Test all candidates in one batch
+        if tables:
+            a, b, c, d = np.array(tables, dtype=np.int64).T
+            p_values = _fisher_exact_two_sided_batch(a, b, c, d, log_fact)
+            for candidate, p_value in zip(enrichment_candidates, p_values.tolist()):
+                candidate["p_value"] = p_value
 
     # Multiple hypothesis correction (Benjamini-Hochberg)
     # Need to do this to take into account the number of tests performed)
     candidate_count = len(enrichment_candidates)
     if candidate_count > 0:
-        # Sort by raw p-value
-        sorted_indices = sorted(
-            range(candidate_count),
-            key=lambda idx: enrichment_candidates[idx]["p_value"]
+        # Sort by raw p-value (stable, so ties keep candidate order)
+        p_values = np.fromiter(
+            (candidate["p_value"] for candidate in enrichment_candidates),
+            dtype=np.float64,
+            count=candidate_count,
         )
-
-        # Calculate adjusted p-values using Benjamini-Hochberg procedure
-        cumulative_min = 1.0
-        adjusted_values = [1.0] * candidate_count
-        for order_idx in range(candidate_count - 1, -1, -1):
-            candidate_idx = sorted_indices[order_idx]
-            rank = order_idx + 1
-            raw_p = enrichment_candidates[candidate_idx]["p_value"]
-            adjusted = (raw_p * candidate_count) / rank
-            if adjusted < cumulative_min:
-                cumulative_min = adjusted
-            adjusted_values[candidate_idx] = cumulative_min if cumulative_min < 1.0 else 1.0
-        for idx, adj_p in enumerate(adjusted_values):
-            enrichment_candidates[idx]["adjusted_p_value"] = adj_p
+        order = np.argsort(p_values, kind="stable")
+
+        # Calculate adjusted p-values using Benjamini-Hochberg procedure:
+        # running minimum of p * n / rank from the largest p-value down, capped at 1
+        ranks = np.arange(1, candidate_count + 1)
+        adjusted_sorted = np.minimum.accumulate((p_values[order] * candidate_count / ranks)[::-1])[::-1]
+        np.minimum(adjusted_sorted, 1.0, out=adjusted_sorted)
+        adjusted_values = np.empty(candidate_count)
+        adjusted_values[order] = adjusted_sorted
+        for candidate, adj_p in zip(enrichment_candidates, adjusted_values.tolist()):
+            candidate["adjusted_p_value"] = adj_p
 
     elapsed = int((time.time() - t0) * 1000)
 